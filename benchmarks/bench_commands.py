@@ -0,0 +1,201 @@
+"""Offline benchmark for the status command and board paths of bot.py.
+
+Runs the real hybrid command callbacks and update_status_board() against the fakes in
+fake_discord.py with synthetic clans, and reports command latency, REST calls per
+command, event-loop blocking and memory per member.
+
+    python benchmarks/bench_commands.py --members 100,1000,10000,100000 --rate 200
+
+--store redis runs the status store against the in-process server of fake_redis.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+STATUS_COMMANDS = ["srn", "b", "dl", "f", "s", "o"]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def load_bot(args, workdir, redis_url=None):
+    # bot.py reads its configuration at import time
+    os.environ.setdefault("BOT_TOKEN", "benchmark")
+    os.environ["STATUS_STORE"] = args.store
+    if redis_url:
+        os.environ["REDIS_URL"] = redis_url
+    os.environ["STATUS_DB_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["BOARD_REFRESH_INTERVAL"] = str(args.board_interval)
+    os.environ["DB_FLUSH_INTERVAL"] = str(args.db_flush_interval)
+    os.environ["BOARD_MODE"] = args.board_mode
+    os.chdir(workdir)
+    import logging
+    import bot as bot_module
+    logging.getLogger("status_board").setLevel(logging.WARNING)
+    return bot_module
+
+
+async def run_scenario(bot_module, args, members, guild_id):
+    from fake_discord import FakeContext, FakeDiscord, LoopMonitor, make_clan
+
+    rng = random.Random(args.seed)
+    discord = FakeDiscord(rest_latency=args.rest_latency / 1000)
+    discord.install(bot_module.bot)
+    status_channel_id = discord.next_id()
+    guild = make_clan(discord, guild_id, status_channel_id, members)
+    channel = discord.channels[status_channel_id]
+    bot_module.bot.state = bot_module.BotState()
+    guild_state = bot_module.bot.state.for_guild(guild_id)
+    guild_state.status_channel_id = status_channel_id
+    await bot_module.status_store.claim([guild_id])
+    clan = guild.members
+
+    # Seed statuses for part of the clan and measure what each one costs in memory
+    statuses = list(bot_module.status_catalog.definitions)
+    seeded = clan[:int(members * args.active)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for member in seeded:
+        bot_module.set_member_status(guild_state, member, rng.choice(statuses))
+    await bot_module.db.run(lambda conn: None)  # Drain the write queue out of the measurement
+    memory_per_member = (tracemalloc.get_traced_memory()[0] - before) / max(1, len(seeded))
+    tracemalloc.stop()
+
+    await bot_module.board_refresher.flush([guild_id])
+
+    # Board render cost on its own, as after a status change: one member moves to the
+    # next status and the content hashes are dropped, so every render rebuilds and sends
+    # the board instead of stopping at the unchanged-content check
+    render_times = []
+    for n in range(args.renders):
+        member = clan[n % len(clan)]
+        current = guild_state.user_statuses.get(member.id)
+        status = statuses[(statuses.index(current) + 1) % len(statuses)] if current in statuses else statuses[0]
+        guild_state.user_statuses.set(member.id, status, member.display_name)
+        guild_state.board_hashes.clear()
+        started = time.perf_counter()
+        await bot_module.update_status_board(guild_state)
+        render_times.append(time.perf_counter() - started)
+
+    discord.rest_calls.clear()
+    monitor = LoopMonitor()
+    monitor.start()
+    latencies = []
+
+    async def invoke(name, member):
+        ctx = FakeContext(discord, channel, member, f"AC {name}")
+        started = time.perf_counter()
+        await bot_module.bot.get_command(name).callback(ctx)
+        latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    run_started = time.perf_counter()
+    for n in range(args.commands):
+        name = "cs" if rng.random() < args.clear_ratio else rng.choice(STATUS_COMMANDS)
+        tasks.append(asyncio.create_task(invoke(name, rng.choice(clan))))
+        # Pace arrivals against the wall clock so slow commands don't lower the rate
+        delay = run_started + (n + 1) / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    await asyncio.gather(*tasks)
+    await bot_module.board_refresher.stop()
+    await bot_module.outbound.stop()  # Queued chatter deletes count towards the run
+    elapsed = time.perf_counter() - run_started
+    await monitor.stop()
+
+    rest_total = sum(discord.rest_calls.values())
+    return {
+        "members": members,
+        "statuses": len(guild_state.user_statuses),
+        "commands": args.commands,
+        "rate": args.rate,
+        "elapsed_s": round(elapsed, 3),
+        "cmd_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "cmd_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rest_per_cmd": round(rest_total / args.commands, 3),
+        "rest_calls": dict(discord.rest_calls),
+        "render_p50_ms": round(percentile(render_times, 50) * 1000, 3),
+        "render_p99_ms": round(percentile(render_times, 99) * 1000, 3),
+        "loop_blocked_ms": round(monitor.blocked * 1000, 3),
+        "loop_max_block_ms": round(monitor.max_block * 1000, 3),
+        "bytes_per_member": round(memory_per_member, 1),
+    }
+
+
+def print_table(results):
+    columns = [
+        ("members", "members"), ("cmd_p50_ms", "p50 ms"), ("cmd_p99_ms", "p99 ms"),
+        ("rest_per_cmd", "REST/cmd"), ("render_p50_ms", "render ms"),
+        ("loop_blocked_ms", "blocked ms"), ("loop_max_block_ms", "max block ms"),
+        ("bytes_per_member", "B/member"),
+    ]
+    print("  ".join(f"{title:>12}" for _, title in columns))
+    for result in results:
+        print("  ".join(f"{result[key]:>12}" for key, _ in columns))
+    for result in results:
+        routes = ", ".join(f"{route}={count}" for route, count in sorted(result["rest_calls"].items()))
+        print(f"{result['members']:>8} members REST calls: {routes}")
+
+
+async def main(args):
+    from fake_redis import FakeRedis
+
+    redis = FakeRedis() if args.store == "redis" else None
+    with tempfile.TemporaryDirectory() as workdir:
+        bot_module = load_bot(args, workdir, redis and await redis.start())
+        bot_module.db.start()
+        await bot_module.status_store.start()
+        results = []
+        try:
+            for guild_id, members in enumerate(args.members, start=1):
+                results.append(await run_scenario(bot_module, args, members, guild_id))
+        finally:
+            await bot_module.status_store.close()
+            await asyncio.to_thread(bot_module.db.close)
+            if redis:
+                await redis.stop()
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            print_table(results)
+        if args.json_out:
+            with open(args.json_out, "w") as f:
+                json.dump(results, f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=lambda s: [int(n) for n in s.split(",")], default=[100, 1000, 10000],
+                        help="comma-separated clan sizes to benchmark (default: 100,1000,10000)")
+    parser.add_argument("--active", type=float, default=0.5, help="fraction of members with a status before the run")
+    parser.add_argument("--commands", type=int, default=1000, help="status commands per clan size")
+    parser.add_argument("--rate", type=float, default=200, help="command arrivals per second")
+    parser.add_argument("--clear-ratio", type=float, default=0.1, help="fraction of commands that are `AC cs`")
+    parser.add_argument("--renders", type=int, default=50, help="standalone board renders to time")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="simulated REST latency in milliseconds")
+    parser.add_argument("--board-interval", type=float, default=0.5, help="BOARD_REFRESH_INTERVAL for the run")
+    parser.add_argument("--board-mode", choices=["single", "pages"], default="single", help="BOARD_MODE for the run")
+    parser.add_argument("--store", choices=["sqlite", "memory", "redis"], default="sqlite", help="STATUS_STORE for the run")
+    parser.add_argument("--db-flush-interval", type=float, default=0.2, help="DB_FLUSH_INTERVAL for the run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--json-out", help="also write results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,255 @@
+"""Offline stand-ins for the discord.py objects bot.py touches.
+
+Only the attributes and coroutines the bot actually uses are implemented. Every
+coroutine that would hit Discord's REST API goes through FakeDiscord.rest(), which
+counts the call per route and can simulate network latency.
+"""
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+
+class Permissions:
+    send_messages = True
+    embed_links = True
+    read_message_history = True
+    manage_messages = True
+
+
+class Asset:
+    def __init__(self, url):
+        self.url = url
+
+
+class FakeUser:
+    def __init__(self, user_id, name, bot=False):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.global_name = name
+        self.mention = f"<@{user_id}>"
+        self.bot = bot
+        self.avatar = None
+        self.default_avatar = Asset("https://cdn.discordapp.com/embed/avatars/0.png")
+        self.display_avatar = self.default_avatar
+        self.mutual_guilds = []
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMember(FakeUser):
+    def __init__(self, guild, user_id, name, bot=False):
+        super().__init__(user_id, name, bot)
+        self.guild = guild
+        self.roles = []
+
+
+class FakeMessage:
+    _state = None  # commands.Context copies it; replies never go through it
+
+    def __init__(self, discord, channel, message_id, author=None, content="", embed=None):
+        self._discord = discord
+        self.channel = channel
+        self.guild = channel.guild
+        self.id = message_id
+        self.author = author
+        self.content = content
+        self.embeds = [embed] if embed else []
+        self.attachments = []
+        self.mentions = []
+
+    async def edit(self, **kwargs):
+        await self._discord.rest("edit_message")
+        if "embed" in kwargs:
+            self.embeds = [kwargs["embed"]]
+        return self
+
+    async def delete(self, *, delay=None):
+        # A delayed delete runs in its own task later on, off the command path; it is
+        # counted right away so it shows up in the per-command REST totals.
+        if delay is None:
+            await self._discord.rest("delete_message")
+            self.channel.messages.pop(self.id, None)
+        else:
+            self._discord.rest_calls["delete_message"] += 1
+
+
+class FakeChannel:
+    def __init__(self, discord, guild, channel_id, name):
+        self._discord = discord
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+        self.messages = {}
+
+    def permissions_for(self, member):
+        return Permissions()
+
+    def get_partial_message(self, message_id):
+        return self.messages.get(message_id) or FakeMessage(self._discord, self, message_id)
+
+    async def send(self, content=None, **kwargs):
+        await self._discord.rest("send_message")
+        message = FakeMessage(self._discord, self, self._discord.next_id(), self._discord.user, content or "", kwargs.get("embed"))
+        self.messages[message.id] = message
+        return message
+
+    async def delete_messages(self, messages):
+        await self._discord.rest("bulk_delete_messages")
+        for message in messages:
+            self.messages.pop(message.id, None)
+
+    def history(self, limit=50):
+        async def iterate():
+            await self._discord.rest("channel_history")
+            for message in list(self.messages.values())[-limit:][::-1]:
+                yield message
+        return iterate()
+
+
+class FakeGuild:
+    def __init__(self, discord, guild_id, name):
+        self._discord = discord
+        self.id = guild_id
+        self.name = name
+        self.chunked = True
+        self.unavailable = False
+        self._members = {}
+        self.channels = []
+        self.me = FakeMember(self, discord.user.id, discord.user.name, bot=True)
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def member_count(self):
+        return len(self._members)
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    async def fetch_member(self, user_id):
+        await self._discord.rest("get_member")
+        return self._members[user_id]
+
+    async def chunk(self):
+        await self._discord.rest("gateway_chunk")
+        return self.members
+
+    async def query_members(self, *, user_ids=None, limit=5, cache=True):
+        await self._discord.rest("gateway_chunk")
+        return [self._members[user_id] for user_id in user_ids or () if user_id in self._members]
+
+    def add_member(self, user_id, name):
+        member = FakeMember(self, user_id, name)
+        self._members[user_id] = member
+        return member
+
+    def add_channel(self, channel_id, name):
+        channel = FakeChannel(self._discord, self, channel_id, name)
+        self.channels.append(channel)
+        self._discord.channels[channel_id] = channel
+        return channel
+
+
+class FakeContext:
+    def __init__(self, discord, channel, author, content=""):
+        self._discord = discord
+        self.bot = discord.bot
+        self.guild = channel.guild
+        self.channel = channel
+        self.author = author
+        self.interaction = None
+        self.message = FakeMessage(discord, channel, discord.next_id(), author, content)
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class FakeDiscord:
+    def __init__(self, rest_latency=0.0):
+        self.rest_latency = rest_latency
+        self.rest_calls = Counter()
+        self.channels = {}
+        self.guilds = {}
+        self.bot = None
+        self._ids = itertools.count(10 ** 17)
+        self.user = FakeUser(self.next_id(), "Arashikage Bot", bot=True)
+
+    def next_id(self):
+        return next(self._ids)
+
+    async def rest(self, route):
+        self.rest_calls[route] += 1
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+    def add_guild(self, guild_id, name="Clan"):
+        guild = FakeGuild(self, guild_id, name)
+        self.guilds[guild_id] = guild
+        return guild
+
+    def get_user(self, user_id):
+        for guild in self.guilds.values():
+            member = guild.get_member(user_id)
+            if member:
+                return member
+        return None
+
+    def install(self, bot):
+        # Benchmark-only monkeypatch: route the bot's cache lookups to the fakes
+        self.bot = bot
+        bot.get_channel = self.channels.get
+        bot.get_guild = self.guilds.get
+        bot.get_user = self.get_user
+        bot_class = type(bot)
+        bot_class.guilds = property(lambda _: list(self.guilds.values()))
+        bot_class.user = property(lambda _: self.user)
+        bot_class.latency = property(lambda _: 0.0)
+
+
+class LoopMonitor:
+    # Measures how long the event loop was blocked: a task asks to wake every
+    # `interval` seconds and records every wake-up that came late.
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.blocked = 0.0
+        self.max_block = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            late = time.perf_counter() - started - self.interval
+            if late > self.interval:
+                self.blocked += late
+                self.max_block = max(self.max_block, late)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def make_clan(discord, guild_id, status_channel_id, members, birthday_channel_id=None):
+    guild = discord.add_guild(guild_id)
+    guild.add_channel(status_channel_id, "status-board")
+    if birthday_channel_id:
+        guild.add_channel(birthday_channel_id, "birthdays")
+    for n in range(members):
+        member = guild.add_member(discord.next_id(), f"member{n:06d}")
+        member.mutual_guilds = [guild]
+    return guild
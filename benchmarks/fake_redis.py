@@ -0,0 +1,245 @@
+"""In-process stand-in for a Redis server, to run bot.py's shared status store offline.
+
+Speaks RESP2 and implements only what RedisStatusStore sends: strings with an expiry
+(SET NX/PX, GET, PEXPIRE, DEL), hashes (HSET, HSETNX, HDEL, HGETALL), MULTI/EXEC and
+PUBLISH/SUBSCRIBE. There is no Lua: EVAL runs a Python copy of the bot's lease scripts,
+picked by the name on their first line. Several bot processes, or several stores in one
+process, can share one server; drop_clients() cuts every connection to exercise reconnects.
+
+    python benchmarks/fake_redis.py --port 6379
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+
+class Error(Exception):
+    pass
+
+
+def encode(value):
+    if isinstance(value, Error):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}  # key -> bytes or dict (hash)
+        self.expires = {}  # key -> monotonic deadline
+        self.subscribers = {}  # channel -> set of client writers
+        self.commands = Counter()  # Commands received, by name (MULTI/EXEC count once per batch)
+        self.port = None
+        self._server = None
+        self._clients = set()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._serve, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        self.drop_clients()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def drop_clients(self):
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+        self.subscribers.clear()
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        if line[:1] != b"*":
+            raise ConnectionError(f"Inline commands are not supported: {line[:50]!r}")
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    async def _serve(self, reader, writer):
+        self._clients.add(writer)
+        queued = None  # Commands held between MULTI and EXEC
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                name = args[0].decode().upper()
+                self.commands[name] += 1
+                if name == "MULTI":
+                    queued = []
+                    writer.write(encode("OK"))
+                elif name == "EXEC":
+                    writer.write(encode([self.execute(command) for command in queued or ()]))
+                    queued = None
+                elif queued is not None:
+                    queued.append(args)
+                    writer.write(encode("QUEUED"))
+                elif name == "SUBSCRIBE":
+                    for channel in args[1:]:
+                        self.subscribers.setdefault(channel, set()).add(writer)
+                        writer.write(encode([b"subscribe", channel, len(args) - 1]))
+                else:
+                    writer.write(encode(self.execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            for writers in self.subscribers.values():
+                writers.discard(writer)
+            writer.close()
+
+    def _get(self, key, kind):
+        if key in self.expires and self.expires[key] <= time.monotonic():
+            del self.expires[key]
+            self.data.pop(key, None)
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, kind):
+            raise Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def execute(self, args):
+        name, args = args[0].decode().upper(), args[1:]
+        try:
+            handler = getattr(self, f"cmd_{name.lower()}", None)
+            if handler is None:
+                return Error(f"ERR unknown command '{name}'")
+            return handler(*args)
+        except Error as e:
+            return e
+        except (TypeError, ValueError):
+            return Error(f"ERR wrong arguments for '{name}' command")
+
+    def cmd_ping(self, *args):
+        return "PONG"
+
+    def cmd_auth(self, *args):
+        return "OK"
+
+    def cmd_select(self, index):
+        return "OK"
+
+    def cmd_get(self, key):
+        return self._get(key, bytes)
+
+    def cmd_set(self, key, value, *options):
+        options = [option.decode().upper() for option in options]
+        exists = self._get(key, object) is not None
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in (("PX", 0.001), ("EX", 1)):
+            if unit in options:
+                self.expires[key] = time.monotonic() + int(options[options.index(unit) + 1]) * scale
+        return "OK"
+
+    def cmd_pexpire(self, key, milliseconds):
+        if self._get(key, object) is None:
+            return 0
+        self.expires[key] = time.monotonic() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._get(key, object) is not None:
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_hset(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise ValueError
+        fields = self._get(key, dict)
+        if fields is None:
+            fields = self.data[key] = {}
+        added = sum(1 for field in pairs[0::2] if field not in fields)
+        fields.update(zip(pairs[0::2], pairs[1::2]))
+        return added
+
+    def cmd_hsetnx(self, key, field, value):
+        fields = self._get(key, dict)
+        if fields is None:
+            fields = self.data[key] = {}
+        if field in fields:
+            return 0
+        fields[field] = value
+        return 1
+
+    def cmd_hdel(self, key, *fields):
+        values = self._get(key, dict) or {}
+        removed = sum(1 for field in fields if values.pop(field, None) is not None)
+        if key in self.data and not values:
+            del self.data[key]
+        return removed
+
+    def cmd_hgetall(self, key):
+        return [item for pair in (self._get(key, dict) or {}).items() for item in pair]
+
+    def cmd_eval(self, script, numkeys, *keys_and_args):
+        numkeys = int(numkeys)
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        name = script.split(b"\n", 1)[0].decode().removeprefix("-- ").strip()
+        handler = getattr(self, f"script_{name.removeprefix('clanbot:').replace('-', '_')}", None) if name.startswith("clanbot:") else None
+        if handler is None:
+            raise Error(f"ERR unknown script '{name}'")
+        return handler(keys, args)
+
+    def script_claim_lease(self, keys, args):
+        # if SET NX PX succeeds or we hold the key already: PEXPIRE it, return 1
+        key, (origin, milliseconds) = keys[0], args
+        if self.cmd_set(key, origin, b"NX", b"PX", milliseconds) is not None:
+            return 1
+        if self.cmd_get(key) == origin:
+            return self.cmd_pexpire(key, milliseconds)
+        return 0
+
+    def script_release_lease(self, keys, args):
+        # DEL the key only while we hold it
+        if self.cmd_get(keys[0]) == args[0]:
+            return self.cmd_del(keys[0])
+        return 0
+
+    def cmd_publish(self, channel, message):
+        writers = self.subscribers.get(channel, ())
+        for writer in writers:
+            writer.write(encode([b"message", channel, message]))
+        return len(writers)
+
+
+async def main(args):
+    server = FakeRedis()
+    await server.start(args.host, args.port)
+    print(f"Fake Redis listening on {args.host}:{server.port}", flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,367 @@
+"""Plays a trace recorded with TRACE_FILE back through the real handlers of bot.py.
+
+Messages go through on_message (and from there the prefix commands), slash commands are
+invoked as the equivalent prefix command, and boards render through the real refresher
+and update_status_board(), all against the fakes in fake_discord.py. The clans are rebuilt
+from the trace header with synthetic members, so no token or network access is needed.
+
+    python benchmarks/replay.py trace.jsonl                  # at recorded speed
+    python benchmarks/replay.py trace.jsonl --speed 20       # 20x faster
+    python benchmarks/replay.py trace.jsonl --speed 0 --profile cprofile --profile-out replay.prof
+    python benchmarks/replay.py trace.jsonl --profile sample --profile-out replay.folded
+
+Handler times are inclusive: on_message contains the command it invoked.
+"""
+import argparse
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def read_trace(path):
+    # A trace file is appended to by every run of the bot; each run starts with a header
+    # and restarts the clock, so later runs are shifted to follow the earlier ones
+    header = {"prefix": "AC ", "board_mode": "single", "guilds": []}
+    guilds = {}
+    events = []
+    offset = last = 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["e"] == "start":
+                header.update({key: value for key, value in record.items() if key != "guilds"})
+                guilds.update((guild["g"], guild) for guild in record.get("guilds", ()))
+                offset = last + (1.0 if events else 0.0)
+                continue
+            record["t"] += offset
+            last = record["t"]
+            events.append(record)
+    header["guilds"] = list(guilds.values())
+    events.sort(key=lambda record: record["t"])
+    return header, events
+
+
+class HandlerTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    async def time(self, name, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.samples[name].append(time.perf_counter() - started)
+
+    def wrap(self, name, func):
+        async def timed(*args, **kwargs):
+            return await self.time(name, func(*args, **kwargs))
+        return timed
+
+    def report(self, recorded):
+        rows = []
+        for name, samples in self.samples.items():
+            command_samples = recorded.get(name.split(" ", 1)[1]) if name.startswith("command ") else None
+            rows.append({
+                "handler": name,
+                "calls": len(samples),
+                "total_ms": round(sum(samples) * 1000, 3),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                "max_ms": round(max(samples) * 1000, 3),
+                "recorded_p50_ms": round(percentile(command_samples, 50), 3) if command_samples else None,
+            })
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+class SamplingProfiler:
+    # Samples the event-loop thread's stack from a helper thread every `interval` seconds.
+    # Cheaper than cProfile on hot paths and shows where the loop actually spends its time.
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def top(self, limit):
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        total = sum(self.stacks.values()) or 1
+        lines = [f"{sum(self.stacks.values())} samples every {self.interval * 1000:g} ms",
+                 f"{'own %':>7}  {'incl %':>7}  function"]
+        for function, count in own.most_common(limit):
+            lines.append(f"{count / total * 100:>7.1f}  {inclusive[function] / total * 100:>7.1f}  {function}")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        # One "frame;frame;frame count" line per stack: flamegraph.pl and speedscope read it
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+def load_bot(args, header, workdir):
+    # bot.py reads its configuration at import time
+    os.environ.setdefault("BOT_TOKEN", "replay")
+    os.environ.pop("TRACE_FILE", None)
+    os.environ["STATUS_DB_PATH"] = os.path.join(workdir, "replay.db")
+    os.environ["STATUS_STORE"] = args.store
+    os.environ["BOARD_MODE"] = header["board_mode"]
+    # Debounce windows are scaled with the replay so a sped-up trace renders as often per event
+    scale = args.speed if args.speed > 0 else 1
+    os.environ["BOARD_REFRESH_INTERVAL"] = str(args.board_interval / scale)
+    os.environ["OUTBOUND_BATCH_WINDOW"] = str(2 / scale)
+    os.environ["LOG_FILE"] = os.path.join(workdir, "replay.log")
+    os.chdir(workdir)
+    import logging
+    import bot as bot_module
+    logging.getLogger("status_board").setLevel(logging.WARNING)
+    return bot_module
+
+
+def build_clans(bot_module, discord, header, events, rng):
+    from fake_discord import make_clan
+
+    statuses = list(bot_module.status_catalog.definitions)
+    for info in header["guilds"]:
+        guild = make_clan(discord, info["g"], info["status_channel"] or discord.next_id(), 0, info["birthday_channel"])
+        for n in range(info["members"]):
+            guild.add_member(discord.next_id(), f"member{n:06d}").mutual_guilds = [guild]
+        guild_state = bot_module.bot.state.for_guild(info["g"])
+        guild_state.status_channel_id = info["status_channel"]
+        guild_state.birthday_channel_id = info["birthday_channel"]
+        guild_state.birthday_role_id = info["birthday_role"]
+        members = guild.members
+        rng.shuffle(members)
+        for status, count in info["statuses"].items():
+            for member in members[:count]:
+                bot_module.set_member_status(guild_state, member, status if status in statuses else rng.choice(statuses))
+            members = members[count:]
+    # Authors, mentioned members and channels that only show up in the events
+    for event in events:
+        if not event.get("g"):
+            continue
+        guild = discord.guilds.get(event["g"]) or discord.add_guild(event["g"])
+        if event["c"] not in discord.channels:
+            guild.add_channel(event["c"], f"channel-{event['c']}")
+        user_ids = [event["a"]] + [int(user_id) for user_id in bot_module.USER_MENTION_RE.findall(event.get("content", ""))]
+        for user_id in user_ids:
+            if guild.get_member(user_id) is None:
+                guild.add_member(user_id, f"user{user_id}").mutual_guilds = [guild]
+
+
+async def replay(bot_module, args, header, events):
+    import discord as discord_py
+    from discord.ext import commands
+    from fake_discord import FakeDiscord, FakeMessage
+
+    class ReplayContext(commands.Context):
+        async def send(self, content=None, **kwargs):
+            return await self.channel.send(content, **kwargs)
+
+        async def reply(self, content=None, **kwargs):
+            return await self.channel.send(content, **kwargs)
+
+    class ReplayMemberConverter(commands.MemberConverter):
+        # The fake members are not discord.Member instances; resolve them from the fake cache
+        async def convert(self, ctx, argument):
+            match = self._get_id_match(argument) or re.match(r"<@!?([0-9]{15,20})>$", argument)
+            member = match and ctx.guild.get_member(int(match.group(1)))
+            if not member:
+                raise commands.MemberNotFound(argument)
+            return member
+
+    bot = bot_module.bot
+    bot.loop = asyncio.get_running_loop()  # Normally set at login; dispatch() schedules on it
+    commands.converter.CONVERTER_MAPPING[discord_py.Member] = ReplayMemberConverter
+    discord = FakeDiscord(rest_latency=args.rest_latency / 1000)
+    discord.install(bot)
+    bot.state = bot_module.BotState()
+    build_clans(bot_module, discord, header, events, random.Random(args.seed))
+    await bot_module.status_store.claim(list(discord.guilds))
+    await bot_module.db.run(lambda conn: None)
+    await bot_module.board_refresher.flush()
+    discord.rest_calls.clear()
+
+    timer = HandlerTimer()
+    get_context, invoke = bot.get_context, bot.invoke
+
+    async def replay_context(origin, *, cls=ReplayContext):
+        return await get_context(origin, cls=ReplayContext)
+
+    async def timed_invoke(ctx):
+        if ctx.command is None:
+            return await invoke(ctx)  # Not a command: nothing to attribute
+        await timer.time(f"command {ctx.command.qualified_name}", invoke(ctx))
+
+    bot.get_context, bot.invoke = replay_context, timed_invoke
+    for name in ("update_status_board", "handle_birthday_message"):
+        setattr(bot_module, name, timer.wrap(name, getattr(bot_module, name)))
+
+    async def handle(event):
+        channel = discord.channels[event["c"]]
+        author = channel.guild.get_member(event["a"])
+        if event["e"] == "message":
+            message = FakeMessage(discord, channel, discord.next_id(), author, event["content"])
+            await timer.time("on_message", bot.on_message(message))
+        else:
+            message = FakeMessage(discord, channel, discord.next_id(), author, f"{header['prefix']}{event['cmd']}")
+            await bot.process_commands(message)
+
+    recorded = defaultdict(list)  # Command durations measured in production
+    for event in events:
+        if event["e"] == "command":
+            recorded[event["cmd"]].append(event["ms"])
+    # Prefix commands are replayed through their message; only slash commands run on their own
+    events = [event for event in events if event["e"] == "message" or (event["e"] == "command" and event["slash"])]
+    profiler = cProfile.Profile() if args.profile == "cprofile" else SamplingProfiler(args.sample_interval) if args.profile == "sample" else None
+    if isinstance(profiler, SamplingProfiler):
+        profiler.start()
+    elif profiler:
+        profiler.enable()
+    tasks, max_behind = [], 0.0
+    started = time.perf_counter()
+    for event in events:
+        if args.speed > 0:
+            delay = started + event["t"] / args.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_behind = max(max_behind, -delay)
+        # The gateway runs every event handler in a task of its own
+        tasks.append(asyncio.create_task(handle(event)))
+    await asyncio.gather(*tasks)
+    await bot_module.board_refresher.stop()
+    await bot_module.outbound.stop()
+    elapsed = time.perf_counter() - started
+    if isinstance(profiler, SamplingProfiler):
+        profiler.stop()
+    elif profiler:
+        profiler.disable()
+    await bot_module.expiry_scheduler.stop()
+
+    duration = events[-1]["t"] - events[0]["t"] if events else 0.0
+    return profiler, {
+        "events": len(events),
+        "trace_s": round(duration, 3),
+        "replay_s": round(elapsed, 3),
+        "speed": round(duration / elapsed, 2) if elapsed else None,
+        "max_behind_ms": round(max_behind * 1000, 3),
+        "rest_calls": dict(discord.rest_calls),
+        "handlers": timer.report(recorded),
+    }
+
+
+def print_report(result):
+    print(f"{result['events']} events, {result['trace_s']} s of trace replayed in {result['replay_s']} s "
+          f"({result['speed']}x); at most {result['max_behind_ms']} ms behind schedule")
+    columns = [("handler", "handler"), ("calls", "calls"), ("total_ms", "total ms"), ("mean_ms", "mean ms"),
+               ("p50_ms", "p50 ms"), ("p99_ms", "p99 ms"), ("max_ms", "max ms"), ("recorded_p50_ms", "recorded p50")]
+    print(f"{'handler':<32}" + "  ".join(f"{title:>12}" for _, title in columns[1:]))
+    for row in result["handlers"]:
+        print(f"{row['handler']:<32}" + "  ".join(f"{'-' if row[key] is None else row[key]:>12}" for key, _ in columns[1:]))
+    routes = ", ".join(f"{route}={count}" for route, count in sorted(result["rest_calls"].items()))
+    print(f"REST calls: {routes or 'none'}")
+
+
+def print_profile(profiler, args):
+    # The summary goes to stdout unless it would break the --json output
+    if isinstance(profiler, SamplingProfiler):
+        summary = profiler.top(args.profile_limit)
+        if args.profile_out:
+            profiler.write_collapsed(args.profile_out)
+    else:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(args.profile_limit)
+        summary = out.getvalue()
+        if args.profile_out:
+            profiler.dump_stats(args.profile_out)
+    if not args.json:
+        print(summary)
+
+
+async def main(args):
+    header, events = read_trace(args.trace)
+    if args.profile_out:
+        args.profile_out = os.path.abspath(args.profile_out)
+    with tempfile.TemporaryDirectory() as workdir:
+        bot_module = load_bot(args, header, workdir)
+        bot_module.db.start()
+        await bot_module.status_store.start()
+        try:
+            profiler, result = await replay(bot_module, args, header, events)
+        finally:
+            await bot_module.status_store.close()
+            await asyncio.to_thread(bot_module.db.close)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print_report(result)
+        if profiler:
+            print_profile(profiler, args)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="JSONL trace written by the bot with TRACE_FILE set")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor; 0 replays as fast as possible")
+    parser.add_argument("--profile", choices=["none", "cprofile", "sample"], default="none", help="profiler to run during the replay")
+    parser.add_argument("--profile-out", help="write the cProfile stats (.prof) or the sampled stacks (collapsed format) here")
+    parser.add_argument("--profile-limit", type=int, default=25, help="functions listed in the profile summary")
+    parser.add_argument("--sample-interval", type=float, default=0.001, help="seconds between stack samples with --profile sample")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="simulated REST latency in milliseconds")
+    parser.add_argument("--board-interval", type=float, default=5.0, help="BOARD_REFRESH_INTERVAL at 1x; scaled down with --speed")
+    parser.add_argument("--store", choices=["sqlite", "memory"], default="sqlite", help="STATUS_STORE for the replay")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,16 +1,32 @@
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
 import re
 import sqlite3
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import asyncio
 import os
 from dotenv import load_dotenv
 import logging
-from flask import Flask
+import logging.handlers
+import queue
+import atexit
 import threading
-
-app = Flask(__name__)
+import time
+import concurrent.futures
+from bisect import bisect_left, insort
+from functools import lru_cache
+from abc import ABC, abstractmethod
+import math
+import json
+import hashlib
+import heapq
+import socket
+import urllib.parse
+import aiohttp
+from aiohttp import web
+
+PROCESS_STARTED = time.perf_counter()  # Reference point of the cold-start timing logged in on_ready
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,167 +37,1669 @@ if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN not found in .env file. Please set it and try again.")
 
 # --- Logging Setup ---
-logging.basicConfig(level=logging.INFO)
+# Loggers only put records on a queue; a QueueListener thread formats them and does all
+# console and file I/O, so logging never blocks the event loop. The file gets one JSON
+# object per line and rotates by size (or by time with LOG_ROTATE_WHEN, e.g. "midnight").
+# Everything, discord.py included, goes through the root logger exactly once.
+LOG_FILE = os.getenv("LOG_FILE", "status_board.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN")
+LOG_REPEAT_WINDOW = float(os.getenv("LOG_REPEAT_WINDOW", "60"))  # Seconds identical warnings and errors are held back after one was logged
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["repeats_suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+LOG_LOCAL_NUMBER_RE = re.compile(r"(?<!\d)\d{1,16}(?!\d)")  # Counts, timings, ports; Discord IDs are longer
+
+class RepeatFilter(logging.Filter):
+    # Lets one of a run of identical warnings/errors through per window and tells on the
+    # next one how many were dropped. Counts and timings don't make a message different,
+    # but guild, channel and user IDs do, so one guild's failure never hides another's.
+    # Records come from the event loop and the DB writer thread alike, hence the lock.
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self._seen = {}  # (logger, level, masked message) -> [time last let through, suppressed since]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING or self.window <= 0:
+            return True
+        key = (record.name, record.levelno, LOG_LOCAL_NUMBER_RE.sub("#", record.getMessage())[:200])
+        now = record.created
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen and now - seen[0] < self.window:
+                seen[1] += 1
+                return False
+            record.suppressed = seen[1] if seen else 0
+            self._seen[key] = [now, 0]
+            if len(self._seen) > 1000:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+        return True
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The message is rendered now, while its arguments still hold their values; the
+        # traceback is formatted later on the listener thread
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+def setup_logging():
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
+    if LOG_ROTATE_WHEN:
+        file_handler = logging.handlers.TimedRotatingFileHandler(LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    queue_handler.addFilter(RepeatFilter(LOG_REPEAT_WINDOW))
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler)
+    listener.start()
+    atexit.register(listener.stop)  # Drains the queue on exit
+    return listener
+
+log_listener = setup_logging()
 logger = logging.getLogger('status_board')
 logger.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s')
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
-file_handler = logging.FileHandler('status_board.log')
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
 
 # --- Constants ---
-# IMPORTANT: Replace these with your actual channel and role IDs
+# Per-guild channels and roles live in the guild_config table (see `AC setup`).
+# These IDs only seed the config of the original clan's guild on first start.
 BIRTHDAY_CHANNEL_ID = 1382590390770733186 # Your actual Birthday Channel ID
 BIRTHDAY_ROLE_ID = 1382591457403211796   # Your actual Birthday Role ID
 STATUS_CHANNEL_ID = 1382683598314016768  # Your actual Status Board Channel ID
+# Sharding: leave both unset for a single automatically sharded process. To split the
+# gateway over several processes, give every process the same SHARD_COUNT and its own
+# SHARD_IDS (e.g. "0,1" and "2,3"); each process then only serves its shards' guilds.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS", "").split(",") if shard_id.strip()] or None
+if SHARD_IDS and not SHARD_COUNT:
+    raise ValueError("SHARD_IDS requires SHARD_COUNT to be set as well.")
+BOARD_REFRESH_INTERVAL = float(os.getenv("BOARD_REFRESH_INTERVAL", "5"))  # Minimum seconds between status board edits
+# "single" keeps the whole board in one embed; "pages" gives the header and every status
+# group messages of their own, so large clans are listed in full
+BOARD_MODE = os.getenv("BOARD_MODE", "single").lower()
+if BOARD_MODE not in ("single", "pages"):
+    raise ValueError("BOARD_MODE must be 'single' or 'pages'.")
+BOARD_PAGE_SIZE = int(os.getenv("BOARD_PAGE_SIZE", "100"))  # Most names per board page in pages mode
+if BOARD_PAGE_SIZE < 1:
+    raise ValueError("BOARD_PAGE_SIZE must be at least 1.")
+DB_PATH = os.getenv("STATUS_DB_PATH", "status_data.db")
+DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "1"))  # Seconds between write-behind flushes
+DB_STATS_INTERVAL = 300  # Seconds between writer statistics log lines
+DB_SLOW_FLUSH_MS = 250  # Flushes slower than this are logged as warnings
+DB_FLUSH_MAX_ATTEMPTS = 5  # Failed flushes of one batch before it is dropped
+HTTP_HOST = os.getenv("HTTP_HOST", "0.0.0.0")
+HTTP_PORT = int(os.getenv("PORT", "8080"))
+HEALTH_MAX_LATENCY = float(os.getenv("HEALTH_MAX_LATENCY", "10"))  # Heartbeat latency (s) above which "/" reports unhealthy
+HEALTH_MAX_DB_QUEUE = int(os.getenv("HEALTH_MAX_DB_QUEUE", "50000"))  # Write-behind backlog above which "/" reports unhealthy
+# Guilds whose board is published on /guilds/{id}/board: comma-separated IDs, or "*" for all.
+# Off by default, since the endpoints are as public as the HTTP port.
+BOARD_API_GUILDS = os.getenv("BOARD_API_GUILDS", "").replace(" ", "")
+BOARD_API_ORIGIN = os.getenv("BOARD_API_ORIGIN", "*")  # Access-Control-Allow-Origin of the board endpoints
+BOARD_API_MIN_INTERVAL = float(os.getenv("BOARD_API_MIN_INTERVAL", "1"))  # Seconds a change may wait to be pushed together with the next ones
+BOARD_API_MAX_WAIT = 60  # Longest long-poll (?wait=) in seconds
+BOARD_API_MAX_STREAMS = int(os.getenv("BOARD_API_MAX_STREAMS", "1000"))  # Open event streams before new ones get a 503
+BOARD_API_KEEPALIVE = 25  # Seconds between comments on an idle event stream, under common proxy timeouts
+BIRTHDAY_POST_TIME = datetime.strptime(os.getenv("BIRTHDAY_POST_TIME", "09:00"), "%H:%M").time().replace(tzinfo=timezone.utc)  # UTC time of the daily birthday announcement
+MEMBER_RECONCILE_MINUTES = float(os.getenv("MEMBER_RECONCILE_MINUTES", "60"))  # Interval of the orphaned-status sweep
+OUTBOUND_BATCH_WINDOW = float(os.getenv("OUTBOUND_BATCH_WINDOW", "2"))  # Seconds a due delete may wait to share a bulk delete
+EXPIRY_BATCH_WINDOW = float(os.getenv("EXPIRY_BATCH_WINDOW", "5"))  # Status expiries this close together are applied as one batch
+# Where member statuses are kept: "sqlite" (the database file above), "memory" (nothing
+# survives a restart; tests and benchmarks) or "redis", shared by every process pointed
+# at the same server so several processes can serve one clan
+STATUS_STORE = os.getenv("STATUS_STORE", "sqlite").lower()
+if STATUS_STORE not in ("sqlite", "memory", "redis"):
+    raise ValueError("STATUS_STORE must be 'sqlite', 'memory' or 'redis'.")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "clanbot")  # Namespace of every key and channel the bot uses
+STORE_FLUSH_INTERVAL = float(os.getenv("STORE_FLUSH_INTERVAL", "0.05"))  # Seconds status writes collect before one pipelined batch
+BOARD_LEASE_SECONDS = float(os.getenv("BOARD_LEASE_SECONDS", "15"))  # A process that stops renewing loses its guilds' boards after this
+STORE_RETRY_SECONDS = 2  # Pause before reconnecting to the shared store
+# Opt-in auto-status from Discord presence. Needs the privileged presence intent, which
+# must also be switched on for the application in the developer portal.
+PRESENCE_AUTO_STATUS = os.getenv("PRESENCE_AUTO_STATUS", "").lower() in ("1", "true", "yes")
+PRESENCE_STATUS_MAP = dict(pair.split("=", 1) for pair in os.getenv("PRESENCE_STATUS_MAP", "offline=o,idle=b").replace(" ", "").split(",") if pair)
+PRESENCE_ENTER_DELAY = float(os.getenv("PRESENCE_ENTER_DELAY", "120"))  # Seconds a mapped presence must hold before its status is set
+PRESENCE_LEAVE_DELAY = float(os.getenv("PRESENCE_LEAVE_DELAY", "60"))  # Seconds back online before the automatic status is cleared
+PRESENCE_MIN_HOLD = float(os.getenv("PRESENCE_MIN_HOLD", "300"))  # Minimum seconds between two automatic changes of one member
+TRACE_FILE = os.getenv("TRACE_FILE")  # JSONL trace of handled messages and commands for benchmarks/replay.py; unset disables it
+
+# The original statuses, in board order. They seed the status_catalog table on first
+# start; after that the table is the source of truth (see `AC status`). Responses are
+# picked by the previous status key, "same" when it is unchanged and "default" otherwise.
+# A status with a "ttl" (seconds) clears itself that long after it was last set.
+DEFAULT_STATUSES = [
+    {
+        "key": "srn", "name": "Studying Right Now", "emoji": "📚",
+        "description": "Set status to Studying Right Now", "help": "Deep in your studies!",
+        "responses": {
+            "same": "📚 Wow, {mention}, you’re a study machine! Still deep in the books—keep that brain buzzing! 🧠✨",
+            "f": "📖 Switching gears, {mention}! You’re now **Studying Right Now**—time to conquer those chapters! 🚀📚",
+            "b": "📖 Switching gears, {mention}! You’re now **Studying Right Now**—time to conquer those chapters! 🚀📚",
+            "s": "📚 Fresh from a nap, {mention}? You’re now **Studying Right Now**—let’s hit those books with full energy! ⚡",
+            "default": "📚 Locked in, {mention}! You’re now **Studying Right Now**—may your focus be as sharp as a ninja! 🥷✨",
+        },
+    },
+    {
+        "key": "b", "name": "On a Break", "emoji": "☕", "ttl": 30 * 60,
+        "description": "Set status to On a Break", "help": "Time for a coffee break!",
+        "responses": {
+            "same": "☕ Another break, {mention}? You’re living the chill life—grab a snack and soak in the vibes! 🍵😎",
+            "srn": "☕ Time for a breather, {mention}! You’re now **On a Break**—kick back and recharge your ninja spirit! 🌟",
+            "s": "☕ Up from your slumber, {mention}? You’re now **On a Break**—let’s sip some tea and ease into the day! 🍵",
+            "default": "☕ Break time, {mention}! You’re now **On a Break**—unwind and let the good vibes flow! 🌈",
+        },
+    },
+    {
+        "key": "dl", "name": "Do Later", "emoji": "⏰",
+        "description": "Set status to Do Later", "help": "Procrastination mode on!",
+        "responses": {
+            "same": "⏰ Still on the ‘later’ train, {mention}? No worries—procrastination is an art form! 🎨😉",
+            "srn": "⏰ Taking a step back, {mention}? You’re now **Do Later**—plan your next move like a true strategist! 🗒️",
+            "f": "⏰ Postponing the fun, {mention}? You’re now **Do Later**—we’ll catch up when the time’s right! ⏳",
+            "default": "⏰ You’re now **Do Later**, {mention}! Take your time—good things come to those who wait! 🕰️",
+        },
+    },
+    {
+        "key": "f", "name": "Free to Chat", "emoji": "🟢",
+        "description": "Set status to Free to Chat", "help": "Ready to hang out!",
+        "responses": {
+            "same": "🟢 Still vibin’, {mention}? You’re free as a bird—let’s chat or team up for something epic! 🐦✨",
+            "srn": "🟢 Task mode off, {mention}! You’re now **Free to Chat**—time to connect with the clan! 🌟",
+            "dl": "🟢 Task mode off, {mention}! You’re now **Free to Chat**—time to connect with the clan! 🌟",
+            "o": "🟢 Back from your adventure, {mention}? You’re now **Free to Chat**—spill the tea on your outing! ☕",
+            "default": "🟢 You’re now **Free to Chat**, {mention}! The clan’s ready to vibe with you—let’s make some memories! 🎉",
+        },
+    },
+    {
+        "key": "s", "name": "Sleeping", "emoji": "😴", "ttl": 10 * 60 * 60,
+        "description": "Set status to Sleeping", "help": "Catching some Z’s!",
+        "responses": {
+            "same": "😴 Still lost in dreamland, {mention}? Keep snoozing—we’ll guard the clan while you rest! 🌙",
+            "f": "😴 Calling it a day, {mention}? You’re now **Sleeping**—drift off to a world of dreams! 💤",
+            "b": "😴 From break to bed, {mention}! You’re now **Sleeping**—rest well, ninja! 🌟",
+            "default": "😴 You’re now **Sleeping**, {mention}! May your dreams be filled with epic clan adventures! 🌌",
+        },
+    },
+    {
+        "key": "o", "name": "Outside", "emoji": "🚶",
+        "description": "Set status to Outside", "help": "Exploring the great outdoors!",
+        "responses": {
+            "same": "🚶 Still exploring, {mention}? The world’s your playground—enjoy every moment out there! 🌍",
+            "s": "🚶 Awake and adventuring, {mention}! You’re now **Outside**—breathe in the fresh air! ☀️",
+            "srn": "🚶 Escaping the books, {mention}? You’re now **Outside**—let nature recharge your soul! 🌳",
+            "default": "🚶 You’re now **Outside**, {mention}! Step into the sunshine and make some memories! 🌞",
+        },
+    },
+]
+STATUS_KEY_RE = re.compile(r"[a-z0-9_-]{1,32}")  # Catalog keys double as command names
+STATUS_NAME_MAX = 80  # "Set status to <name>" has to fit a slash command description (100)
+STATUS_EMOJI_MAX = 64  # Room for a custom emoji's <a:name:id> markup
+STATUS_CATALOG_MAX = 24  # The single board has a field per status plus the summary, of 25 per embed
+BOARD_FIELD_LIMIT = 10  # Names listed per status field before "+ N more"
+BOARD_PAGE_CHARS = 4096  # Discord's embed description limit; a board page starts a new one before it
+STATS_DAYS = 7  # Window of `AC stats` and `AC leaderboard`
+
+# --- Metrics ---
+# Plain counters and fixed-bucket histograms exported on /metrics in Prometheus text
+# format. Every series is only ever updated from one thread (the event loop, or the DB
+# writer for the SQLite series) and a scrape just copies the current values, so hot
+# paths pay a dict update and no lock.
+class Metric:
+    def __init__(self, name, help_text, kind, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.labelnames = labelnames
+
+    def _labels(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+    def _format(self, value):
+        if isinstance(value, float) and math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+class Counter(Metric):
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, "counter", labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        return [f"{self.name}{self._labels(labels)} {self._format(value)}" for labels, value in list(self._values.items())]
+
+class Gauge(Metric):
+    # Read at scrape time from a callback, so nothing has to keep it up to date
+    def __init__(self, name, help_text, read):
+        super().__init__(name, help_text, "gauge")
+        self.read = read
+
+    def samples(self):
+        try:
+            value = float(self.read())
+        except Exception:
+            value = float("nan")
+        return [f"{self.name} {'NaN' if math.isnan(value) else self._format(value)}"]
+
+class Histogram(Metric):
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        super().__init__(name, help_text, "histogram", labelnames)
+        self.buckets = sorted(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        lines = []
+        for labels, series in list(self._series.items()):
+            series = list(series)
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float("inf")], series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(labels, [('le', self._format(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {self._format(series[-1])}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+metrics = MetricsRegistry()
+COMMANDS_TOTAL = metrics.add(Counter("clanbot_commands_total", "Commands invoked, by command and outcome.", ("command", "outcome")))
+COMMAND_SECONDS = metrics.add(Histogram("clanbot_command_duration_seconds", "Command handler latency.", LATENCY_BUCKETS, ("command",)))
+BOARD_RENDER_SECONDS = metrics.add(Histogram("clanbot_board_render_seconds", "Time to build a status board embed.", LATENCY_BUCKETS))
+BOARD_EDITS_SENT = metrics.add(Counter("clanbot_board_edits_sent_total", "Status board edits or sends issued to Discord."))
+BOARD_EDITS_SKIPPED = metrics.add(Counter("clanbot_board_edits_skipped_total", "Board updates absorbed without an edit of their own.", ("reason",)))
+REST_REQUESTS = metrics.add(Counter("clanbot_discord_rest_requests_total", "Discord REST requests, by method and HTTP status.", ("method", "status")))
+REST_SECONDS = metrics.add(Histogram("clanbot_discord_rest_duration_seconds", "Discord REST request latency.", LATENCY_BUCKETS, ("method",)))
+REST_RATE_LIMITED = metrics.add(Counter("clanbot_discord_rate_limited_total", "Discord REST responses with HTTP 429."))
+DB_FLUSH_SECONDS = metrics.add(Histogram("clanbot_db_flush_duration_seconds", "Write-behind flush transaction latency.", LATENCY_BUCKETS))
+DB_CALL_SECONDS = metrics.add(Histogram("clanbot_db_call_duration_seconds", "Latency of reads and batched operations on the DB thread.", LATENCY_BUCKETS))
+LOOP_LAG_SECONDS = metrics.add(Histogram("clanbot_event_loop_lag_seconds", "How late the event loop ran a timer that should have fired.", LATENCY_BUCKETS))
+OUTBOUND_DELETES = metrics.add(Counter("clanbot_outbound_deletes_total", "Messages removed by the outbound queue, by delete method.", ("method",)))
+STATUSES_EXPIRED = metrics.add(Counter("clanbot_statuses_expired_total", "Statuses cleared because their TTL ran out."))
+OUTBOUND_DEFERRED = metrics.add(Counter("clanbot_outbound_deferred_total", "Outbound batches held back until a rate-limit bucket reset."))
+AUTO_STATUS_CHANGES = metrics.add(Counter("clanbot_auto_status_changes_total", "Statuses set or cleared from presence, by action.", ("action",)))
+BIRTHDAYS_ANNOUNCED = metrics.add(Counter("clanbot_birthdays_announced_total", "Birthday embeds posted, by trigger (scheduled or mention).", ("source",)))
+AUTO_STATUS_SUPPRESSED = metrics.add(Counter("clanbot_auto_status_suppressed_total", "Pending presence changes cancelled because the presence flipped back."))
+BOARD_API_REQUESTS = metrics.add(Counter("clanbot_board_api_requests_total", "Board API responses, by endpoint and HTTP status.", ("endpoint", "status")))
+BOARD_API_SNAPSHOTS = metrics.add(Counter("clanbot_board_api_snapshots_total", "Board API snapshots encoded after a status change."))
+
+def _rest_tracer():
+    # Counts every REST call discord.py makes (the gateway websocket is left out)
+    async def on_request_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        if "/api/" not in params.url.path:
+            return
+        REST_SECONDS.observe(time.perf_counter() - ctx.started, params.method)
+        REST_REQUESTS.inc(params.method, params.response.status)
+        rate_limits.observe(params.method, params.url.path, params.response.headers)
+        if params.response.status == 429:
+            REST_RATE_LIMITED.inc()
+
+    async def on_request_exception(session, ctx, params):
+        REST_REQUESTS.inc(params.method, "error")
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+async def monitor_event_loop(interval=0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - expected))
+
+# --- Event Capture ---
+# Opt-in with TRACE_FILE: every message and command the bot handles is appended to a
+# JSONL trace that benchmarks/replay.py plays back offline against fake Discord objects.
+# Message text is redacted down to the invoked command and mention tokens, and lines are
+# written by a background thread so recording never blocks the event loop.
+TRACE_WORD_RE = re.compile(r"(<(?:@[!&]?|#)\d+>)|\S+")
+
+def redact_content(content):
+    # "AC stats <@1> please" -> "AC stats <@1> _"; mentions drive the birthday handler
+    prefix = bot.command_prefix
+    head = ""
+    if content.startswith(prefix):
+        name = content[len(prefix):].split(None, 1)
+        if name and bot.get_command(name[0]):
+            head = prefix + name[0]
+    return head + TRACE_WORD_RE.sub(lambda m: m.group(1) or "_", content[len(head):])
+
+class TraceRecorder:
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._started = None  # Monotonic time offsets in the trace are relative to
+
+    @property
+    def enabled(self):
+        return self._thread is not None
+
+    def start(self, header):
+        if self.path and self._thread is None:
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+            self._thread.start()
+            self._put({"e": "start", "v": 1, "at": time.time(), **header})
+            logger.info(f"Recording messages and commands to {self.path}")
+
+    def stop(self):
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(10)
+            self._thread = None
+
+    def message(self, message):
+        self.record("message", g=message.guild.id if message.guild else None, c=message.channel.id,
+                    a=message.author.id, content=redact_content(message.content))
+
+    def command(self, ctx, seconds):
+        self.record("command", g=ctx.guild.id if ctx.guild else None, c=ctx.channel.id, a=ctx.author.id,
+                    cmd=ctx.command.qualified_name, slash=ctx.interaction is not None,
+                    ok=not ctx.command_failed, ms=round(seconds * 1000, 3))
+
+    def record(self, event, **fields):
+        if self._thread:
+            self._put({"t": round(time.monotonic() - self._started, 4), "e": event, **fields})
+
+    def _put(self, record):
+        self._queue.put(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                f.write(line + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+def trace_header():
+    # What replay needs to rebuild the clans: their channels, sizes and status counts, no names
+    guilds = []
+    for guild_id, guild_state in bot.state.guilds.items():
+        guild = bot.get_guild(guild_id)
+        guilds.append({
+            "g": guild_id,
+            "status_channel": guild_state.status_channel_id,
+            "birthday_channel": guild_state.birthday_channel_id,
+            "birthday_role": guild_state.birthday_role_id,
+            "members": (guild.member_count or len(guild.members)) if guild else len(guild_state.user_statuses),
+            "statuses": {status: guild_state.user_statuses.count(status) for status in guild_state.user_statuses.statuses()
+                         if guild_state.user_statuses.count(status)},
+        })
+    return {"prefix": bot.command_prefix, "board_mode": BOARD_MODE, "guilds": guilds}
+
+event_trace = TraceRecorder(TRACE_FILE)
+
+# --- Rate Limits ---
+# Discord reports the state of every route's bucket in X-RateLimit-* response headers.
+# The tracer above feeds them in here, so background work (see OutboundQueue) can hold
+# back until a bucket resets instead of running into a 429 that stalls the route.
+_MAJOR_PARAMETERS = ("channels", "guilds", "webhooks")
+
+def rate_limit_route(method, path):
+    # "DELETE /api/v10/channels/1/messages/2" -> "DELETE /channels/1/messages/{id}": Discord
+    # buckets per channel, guild or webhook, so only that ID stays in the key
+    parts = path.split("/api/", 1)[-1].strip("/").split("/")
+    if re.fullmatch(r"v\d+", parts[0]):
+        parts = parts[1:]
+    major = len(parts) > 1 and parts[0] in _MAJOR_PARAMETERS
+    return method + " /" + "/".join("{id}" if part.isdigit() and not (major and n == 1) else part for n, part in enumerate(parts))
+
+class RateLimitTracker:
+    def __init__(self):
+        self._buckets = {}  # route -> [remaining, reset time on the monotonic clock]
+
+    def observe(self, method, path, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is None or reset_after is None:
+            return
+        try:
+            self._buckets[rate_limit_route(method, path)] = [int(remaining), time.monotonic() + float(reset_after)]
+        except ValueError:
+            pass
+
+    def delay(self, method, path):
+        # Seconds until the route's bucket has room again (0 when it has room now)
+        route = rate_limit_route(method, path)
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            return 0.0
+        wait = bucket[1] - time.monotonic()
+        if wait <= 0:
+            del self._buckets[route]
+            return 0.0
+        return wait if bucket[0] <= 0 else 0.0
+
+    def spend(self, method, path):
+        # Count a request against the bucket before its response arrives
+        bucket = self._buckets.get(rate_limit_route(method, path))
+        if bucket:
+            bucket[0] -= 1
+
+rate_limits = RateLimitTracker()
+
+# --- Status Catalog ---
+# Every status lookup on the command and board paths goes through these precomputed
+# tables: emoji, label and board position per key, and the response for every
+# (old status, new status) pair. A catalog change builds a new StatusCatalog and swaps
+# it in (see apply_status_catalog), so readers never see a half-updated one.
+class StatusCatalog:
+    def __init__(self, definitions):
+        self.definitions = {definition["key"]: definition for definition in definitions}  # key -> definition, in board order
+        self.order = {key: position for position, key in enumerate(self.definitions)}
+        self.emojis = {key: definition["emoji"] for key, definition in self.definitions.items()}
+        self.names = {key: definition["name"] for key, definition in self.definitions.items()}
+        self.labels = {key: f"{definition['name']} {definition['emoji']}" for key, definition in self.definitions.items()}
+        self.ttls = {key: definition["ttl"] for key, definition in self.definitions.items() if definition.get("ttl")}
+        keys = [f"AC {key}" for key in self.definitions]
+        self.commands_text = ", ".join(keys[:-1]) + f", or {keys[-1]}" if len(keys) > 1 else "".join(keys)
+        self._responses = {}  # (old key, new key) -> response with "{mention}" left in
+        for key, definition in self.definitions.items():
+            responses = definition.get("responses") or {}
+            name, emoji = definition["name"], definition["emoji"]
+            default = responses.get("default") or f"{emoji} You’re now **{name}**, {{mention}}! 🌟"
+            for old_key in [None, *self.definitions]:
+                if old_key == key:
+                    response = responses.get("same") or f"{emoji} Still **{name}**, {{mention}}? Keep it up! 🌟"
+                else:
+                    response = responses.get(old_key) or default
+                self._responses[(old_key, key)] = response
+
+    def emoji(self, key):
+        return self.emojis.get(key, "🌟")
+
+    def name(self, key):
+        return self.names.get(key, key)
+
+    def label(self, key):
+        return self.labels.get(key, key)
+
+    def response(self, old_key, new_key, mention):
+        # An old status that has left the catalog answers like no status at all
+        response = self._responses.get((old_key, new_key)) or self._responses[(None, new_key)]
+        return response.replace("{mention}", mention)
+
+status_catalog = StatusCatalog(DEFAULT_STATUSES)
+
+# --- Status Index ---
+# Keeps every status group pre-sorted by display name as (name_key, user_id) entries in
+# bisect-maintained lists, so setting or clearing a status never re-sorts the clan.
+# The text of each board field is cached per group and rebuilt only for groups that
+# changed since the last render.
+class StatusIndex:
+    def __init__(self, groups):
+        self._statuses = {}  # user_id -> status
+        self._names = {}  # user_id -> display name
+        self._groups = {status: [] for status in groups}  # status -> sorted [(name_key, user_id)]
+        self._fields = {}  # status -> cached (field name, field value)
+        self._pages = {}  # status -> cached page texts for pages mode
+        self.version = 0  # Bumped on every change, so snapshots of the index know when they are stale
+        self.updated_at = None  # Unix time of the last change
+
+    def __len__(self):
+        return len(self._statuses)
+
+    def __contains__(self, user_id):
+        return user_id in self._statuses
+
+    def get(self, user_id, default=None):
+        return self._statuses.get(user_id, default)
+
+    def items(self):
+        return self._statuses.items()
+
+    def name(self, user_id):
+        return self._names.get(user_id)
+
+    def members(self, status):
+        return [user_id for _, user_id in self._groups.get(status, ())]
+
+    def count(self, status):
+        return len(self._groups.get(status, ()))
+
+    def statuses(self):
+        # Every group in board order, empty ones included
+        return list(self._groups)
+
+    def reorder(self, groups):
+        # The catalog changed: follow its order (statuses it dropped go last) and rebuild every text
+        self._groups = {**{status: self._groups.get(status, []) for status in groups},
+                        **{status: group for status, group in self._groups.items() if status not in groups}}
+        self._fields.clear()
+        self._pages.clear()
+        self._touch()
+
+    def set(self, user_id, status, name):
+        # Returns the previous status (or None)
+        old_status = self._statuses.get(user_id)
+        if old_status == status and self._names.get(user_id) == name:
+            return old_status
+        if old_status is not None:
+            self._unlink(user_id, old_status)
+        self._statuses[user_id] = status
+        self._names[user_id] = name
+        insort(self._groups.setdefault(status, []), (name.lower(), user_id))
+        self._fields.pop(status, None)
+        self._pages.pop(status, None)
+        self._touch()
+        return old_status
+
+    def remove(self, user_id):
+        old_status = self._statuses.pop(user_id, None)
+        if old_status is not None:
+            self._unlink(user_id, old_status)
+            del self._names[user_id]
+            self._touch()
+        return old_status
+
+    def rename(self, user_id, name):
+        status = self._statuses.get(user_id)
+        if status is not None and self._names[user_id] != name:
+            self.set(user_id, status, name)
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = time.time()
+
+    def _unlink(self, user_id, status):
+        group = self._groups[status]
+        entry = (self._names[user_id].lower(), user_id)
+        del group[bisect_left(group, entry)]
+        self._fields.pop(status, None)
+        self._pages.pop(status, None)
+
+    def fields(self):
+        # Yields (field name, field value) for every non-empty group, in board order
+        for status, group in self._groups.items():
+            if not group:
+                continue
+            field = self._fields.get(status)
+            if field is None:
+                emoji = status_catalog.emoji(status)
+                user_list = ", ".join(self._names[user_id] for _, user_id in group[:BOARD_FIELD_LIMIT])
+                if len(group) > BOARD_FIELD_LIMIT:
+                    user_list += f" + {len(group) - BOARD_FIELD_LIMIT} more"
+                field = (f"{emoji} {status_catalog.name(status).split(' ')[0]} ({len(group)})", user_list)
+                self._fields[status] = field
+            yield field
+
+    def pages(self, status, size):
+        # The group's names split into page texts of at most `size` names and
+        # BOARD_PAGE_CHARS characters each (pages mode)
+        pages = self._pages.get(status)
+        if pages is None:
+            pages, names, length = [], [], 0
+            for _, user_id in self._groups.get(status, ()):
+                name = self._names[user_id]
+                if names and (len(names) == size or length + 2 + len(name) > BOARD_PAGE_CHARS):
+                    pages.append(", ".join(names))
+                    names, length = [], 0
+                length += len(name) + (2 if names else 0)
+                names.append(name)
+            if names:
+                pages.append(", ".join(names))
+            self._pages[status] = pages
+        return pages
 
 # --- Bot State Management ---
+class GuildState:
+    def __init__(self, guild_id, status_channel_id=None, birthday_channel_id=None, birthday_role_id=None):
+        self.guild_id = guild_id
+        self.status_channel_id = status_channel_id
+        self.birthday_channel_id = birthday_channel_id
+        self.birthday_role_id = birthday_role_id
+        self.user_statuses = StatusIndex(status_catalog.definitions)  # user_id -> status key, grouped and name-ordered
+        self.status_since = {}  # user_id -> unix time the current status was set
+        self.status_expires = {}  # user_id -> unix time the current status clears itself (statuses with a TTL)
+        self.status_message_id = None  # ID of the status board message, edited in place without fetching
+        self.board_pages = {}  # page key -> message ID of that page (BOARD_MODE=pages)
+        self.board_hashes = {}  # page key -> hash of the content last sent, to skip no-op edits
+        self.auto_status = set()  # user IDs whose status follows their presence
+
 class BotState:
     def __init__(self):
-        self.user_statuses = {}  # Dictionary to store user_id: status
-        self.status_message = None  # Store the status board message object
+        self.guilds = {}  # guild_id -> GuildState, only for guilds on this process's shards
+        self.channel_perms = {}  # channel_id -> bot permissions, dropped on channel/role/member updates
+        self.birthday_day = None  # UTC date the celebrated set below belongs to
+        self.birthdays_celebrated = set()  # (guild_id, user_id) already celebrated today
+        self.started = False  # Startup ran; later on_ready events (reconnects) skip it
+        self.first_render_seconds = None  # READY to the first board render of this process
+
+    def for_guild(self, guild_id):
+        guild_state = self.guilds.get(guild_id)
+        if guild_state is None:
+            guild_state = self.guilds[guild_id] = GuildState(guild_id)
+        return guild_state
+
+# --- Persistence Layer ---
+# All SQLite access goes through one long-lived WAL connection owned by a dedicated
+# writer thread, so no commit or fsync ever runs on the event loop. Writes are queued
+# by key and applied in a single transaction per flush interval; repeated writes to the
+# same key (a member switching status twice in a second) collapse into the last one.
+# Reads are shipped to the same thread and run after pending writes are flushed.
+class WriteBehindDB:
+    def __init__(self, path, flush_interval, on_connect=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.on_connect = on_connect
+        self._pending = {}  # key -> (sql, params), last write wins
+        self._appends = []  # (sql, params) that must all be applied, e.g. event log rows
+        self._calls = []  # (func, args, future) to run on the writer thread
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread = None
+        self._stopped = None  # Why the writer thread is gone; set once it has exited
+        self._failed_flushes = 0  # Consecutive flushes that failed on the current batch
+        # Writer statistics
+        self.flush_count = 0
+        self.rows_written = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def queue_depth(self):
+        return len(self._pending) + len(self._appends)
+
+    def start(self):
+        if self._thread is None:
+            self._stopped = None
+            self._thread = threading.Thread(target=self._run, name="status-db-writer", daemon=True)
+            self._thread.start()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def write(self, key, sql, params=()):
+        with self._cond:
+            self._pending[key] = (sql, params)
+
+    def append(self, sql, params=()):
+        with self._cond:
+            self._appends.append((sql, params))
+
+    def call(self, func, *args):
+        # Runs func(conn, *args) on the writer thread; returns a concurrent.futures.Future
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self._stopped is not None:
+                raise RuntimeError("The DB writer is not running.") from self._stopped
+            self._calls.append((func, args, future))
+            self._cond.notify()
+        return future
+
+    async def run(self, func, *args):
+        return await asyncio.wrap_future(self.call(func, *args))
+
+    def close(self, timeout=10):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "flush_count": self.flush_count,
+            "rows_written": self.rows_written,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
 
-# --- Database Initialization ---
-def init_db():
-    with sqlite3.connect('status_data.db') as conn:
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS user_statuses
-                     (user_id INTEGER PRIMARY KEY, status TEXT)''')
-        conn.commit()
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")  # Shard processes share the database file
+            conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; skips the fsync on every commit
+            if self.on_connect:
+                self.on_connect(conn)
+        except Exception as e:
+            logger.critical(f"Could not open the database at {self.path}: {e}", exc_info=True)
+            self._stop(e)
+            return
+        try:
+            self._serve(conn)
+        except Exception as e:
+            logger.critical(f"DB writer crashed: {e}", exc_info=True)
+            self._stop(e)
+        else:
+            self._stop(RuntimeError("The DB writer was closed."))
+        finally:
+            conn.close()
+
+    def _stop(self, reason):
+        # Nothing will run queued calls any more, so fail them instead of leaving them pending
+        with self._cond:
+            self._stopped = reason
+            calls, self._calls = self._calls, []
+        for _, _, future in calls:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(reason)
+
+    def _serve(self, conn):
+        next_flush = time.monotonic() + self.flush_interval
+        next_stats = time.monotonic() + DB_STATS_INTERVAL
+        while True:
+            with self._cond:
+                while not self._calls and not self._closing and time.monotonic() < next_flush:
+                    self._cond.wait(next_flush - time.monotonic())
+                calls, self._calls = self._calls, []
+                pending, appends = self._pending, self._appends
+                self._pending, self._appends = {}, []
+                closing = self._closing
+
+            if pending or appends:
+                self._flush(conn, pending, appends)
+            if time.monotonic() >= next_flush:
+                next_flush = time.monotonic() + self.flush_interval
+
+            for func, args, future in calls:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    started = time.perf_counter()
+                    future.set_result(func(conn, *args))
+                    conn.commit()
+                    DB_CALL_SECONDS.observe(time.perf_counter() - started)
+                except Exception as e:
+                    conn.rollback()
+                    future.set_exception(e)
+
+            if time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + DB_STATS_INTERVAL
+                logger.info(f"DB writer stats: {self.stats()}")
+
+            if closing:
+                with self._cond:
+                    if not self._pending and not self._appends and not self._calls:
+                        break
+        logger.info(f"DB writer stopped after {self.flush_count} flushes ({self.rows_written} rows written)")
+
+    def _flush(self, conn, pending, appends):
+        started = time.perf_counter()
+        count = len(pending) + len(appends)
+        try:
+            with conn:  # One transaction for the whole batch
+                for sql, params in pending.values():
+                    conn.execute(sql, params)
+                for sql, params in appends:
+                    conn.execute(sql, params)
+        except sqlite3.Error as e:
+            # Usually SQLITE_BUSY from another shard process holding the file: the batch goes
+            # back in the queue for the next flush, behind any newer write of the same key
+            self._failed_flushes += 1
+            if self._failed_flushes >= DB_FLUSH_MAX_ATTEMPTS:
+                self._failed_flushes = 0
+                logger.error(f"DB flush of {count} queued writes failed {DB_FLUSH_MAX_ATTEMPTS} times; dropping them: {e}", exc_info=True)
+                return
+            with self._cond:
+                for key, write in pending.items():
+                    self._pending.setdefault(key, write)
+                self._appends[:0] = appends
+            logger.warning(f"DB flush of {count} queued writes failed (attempt {self._failed_flushes} of {DB_FLUSH_MAX_ATTEMPTS}); retrying: {e}")
+            return
+        self._failed_flushes = 0
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        DB_FLUSH_SECONDS.observe(elapsed_ms / 1000)
+        self.flush_count += 1
+        self.rows_written += count
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        if elapsed_ms > DB_SLOW_FLUSH_MS:
+            logger.warning(f"Slow DB flush: {count} writes took {elapsed_ms:.1f} ms (queue depth now {self.queue_depth})")
 
-init_db()
+# --- Database Initialization ---
+def init_db(conn):
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS guild_config
+                 (guild_id INTEGER PRIMARY KEY, status_channel_id INTEGER,
+                  birthday_channel_id INTEGER, birthday_role_id INTEGER)''')
+    columns = [row[1] for row in c.execute("PRAGMA table_info(user_statuses)")]
+    if columns and "guild_id" not in columns:
+        # Single-clan schema: keep the rows under guild 0 until the home guild is known
+        c.execute("ALTER TABLE user_statuses RENAME TO user_statuses_single")
+    c.execute('''CREATE TABLE IF NOT EXISTS user_statuses
+                 (guild_id INTEGER, user_id INTEGER, status TEXT, display_name TEXT,
+                  PRIMARY KEY (guild_id, user_id))''')
+    if columns and "guild_id" not in columns:
+        c.execute("INSERT INTO user_statuses (guild_id, user_id, status) SELECT 0, user_id, status FROM user_statuses_single")
+        c.execute("DROP TABLE user_statuses_single")
+        logger.info("Migrated user_statuses to the per-guild schema.")
+    columns = [row[1] for row in c.execute("PRAGMA table_info(user_statuses)")]
+    for column, column_type in (("display_name", "TEXT"), ("since", "REAL"), ("expires_at", "REAL")):
+        if column not in columns:
+            c.execute(f"ALTER TABLE user_statuses ADD COLUMN {column} {column_type}")
+    c.execute('''CREATE TABLE IF NOT EXISTS board_messages
+                 (channel_id INTEGER PRIMARY KEY, message_id INTEGER)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS board_pages
+                 (channel_id INTEGER, page TEXT, message_id INTEGER, content_hash TEXT,
+                  PRIMARY KEY (channel_id, page))''')
+    # Append-only log of every status change, plus per-day totals derived from it
+    c.execute('''CREATE TABLE IF NOT EXISTS status_events
+                 (id INTEGER PRIMARY KEY, guild_id INTEGER, user_id INTEGER,
+                  old_status TEXT, new_status TEXT, at REAL)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS status_rollups
+                 (guild_id INTEGER, user_id INTEGER, day TEXT, status TEXT, seconds REAL,
+                  PRIMARY KEY (guild_id, user_id, day, status))''')
+    c.execute("CREATE INDEX IF NOT EXISTS status_rollups_by_day ON status_rollups (guild_id, status, day)")
+    c.execute("CREATE TABLE IF NOT EXISTS bot_meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute('''CREATE TABLE IF NOT EXISTS birthdays
+                 (guild_id INTEGER, user_id INTEGER, month INTEGER, day INTEGER,
+                  PRIMARY KEY (guild_id, user_id))''')
+    c.execute("CREATE INDEX IF NOT EXISTS birthdays_by_date ON birthdays (month, day)")
+    c.execute('''CREATE TABLE IF NOT EXISTS auto_status
+                 (guild_id INTEGER, user_id INTEGER, applied_status TEXT, applied_at REAL,
+                  PRIMARY KEY (guild_id, user_id))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS status_catalog
+                 (key TEXT PRIMARY KEY, name TEXT, emoji TEXT, position INTEGER,
+                  description TEXT, help TEXT, responses TEXT, ttl REAL)''')
+    if "ttl" not in [row[1] for row in c.execute("PRAGMA table_info(status_catalog)")]:
+        c.execute("ALTER TABLE status_catalog ADD COLUMN ttl REAL")
+        for definition in DEFAULT_STATUSES:
+            c.execute("UPDATE status_catalog SET ttl = ? WHERE key = ?", (definition.get("ttl"), definition["key"]))
+    if not c.execute("SELECT COUNT(*) FROM status_catalog").fetchone()[0]:
+        for position, definition in enumerate(DEFAULT_STATUSES):
+            _save_status_definition(conn, definition, position)
+    if c.execute("PRAGMA user_version").fetchone()[0] < 1:
+        # Statuses used to be stored by their label ("Sleeping 😴"); they are stored by catalog key now
+        for key, name, emoji in c.execute("SELECT key, name, emoji FROM status_catalog").fetchall():
+            label = f"{name} {emoji}"
+            c.execute("UPDATE user_statuses SET status = ? WHERE status = ?", (key, label))
+            c.execute("UPDATE status_rollups SET status = ? WHERE status = ?", (key, label))
+            c.execute("UPDATE status_events SET old_status = ? WHERE old_status = ?", (key, label))
+            c.execute("UPDATE status_events SET new_status = ? WHERE new_status = ?", (key, label))
+        c.execute("PRAGMA user_version = 1")
+    conn.commit()
+
+def _save_status_definition(conn, definition, position):
+    conn.execute("INSERT OR REPLACE INTO status_catalog (key, name, emoji, position, description, help, responses, ttl) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                 (definition["key"], definition["name"], definition["emoji"], position, definition["description"],
+                  definition.get("help"), json.dumps(definition.get("responses") or {}, ensure_ascii=False), definition.get("ttl")))
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM bot_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def save_meta(key, value):
+    db.write(("bot_meta", key), "INSERT OR REPLACE INTO bot_meta (key, value) VALUES (?, ?)", (key, value))
+
+def _load_status_catalog(conn):
+    rows = conn.execute("SELECT key, name, emoji, description, help, responses, ttl FROM status_catalog ORDER BY position, key").fetchall()
+    return [{"key": key, "name": name, "emoji": emoji, "description": description, "help": help_text, "responses": json.loads(responses or "{}"), "ttl": ttl}
+            for key, name, emoji, description, help_text, responses, ttl in rows]
+
+db = WriteBehindDB(DB_PATH, DB_FLUSH_INTERVAL, on_connect=init_db)
+metrics.add(Gauge("clanbot_db_queue_depth", "Writes waiting for the next flush.", lambda: db.queue_depth))
 
 # --- Bot Setup ---
 intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True # Required for reading message content
-
-bot = commands.Bot(
+intents.presences = PRESENCE_AUTO_STATUS  # Privileged; only needed for auto-status
+
+class NotGuildOwner(commands.CheckFailure):
+    pass
+
+class ClanBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        db.start()
+        await status_store.start()
+        # Commands exist for the seed catalog already; swap in the stored one before the tree syncs
+        await apply_status_catalog(StatusCatalog(await db.run(_load_status_catalog)), sync=False)
+        self.loop.create_task(monitor_event_loop())
+        await http_server.start()
+
+    async def close(self):
+        # Push any pending board change and command cleanup out before the connection goes away
+        await expiry_scheduler.stop()
+        await auto_status.scheduler.stop()
+        await board_refresher.stop()
+        await outbound.stop()
+        await http_server.stop()
+        await super().close()
+        # Then drain the write queues so no status change is lost
+        await status_store.close()
+        await asyncio.to_thread(db.close)
+        await asyncio.to_thread(event_trace.stop)
+
+    async def on_command_error(self, ctx, error):
+        if isinstance(error, NotGuildOwner):
+            return  # The process that owns the guild answers
+        if ctx.command and not getattr(ctx, "metrics_recorded", False):
+            # Rejected by a check or while parsing arguments, so record_command_metrics never ran
+            COMMANDS_TOTAL.inc(ctx.command.qualified_name, command_error_outcome(error))
+        await super().on_command_error(ctx, error)
+
+bot = ClanBot(
     command_prefix='AC ',
     intents=intents,
     help_command=None,
-    case_insensitive=True
+    case_insensitive=True,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS,
+    http_trace=_rest_tracer(),
+    # Members are chunked lazily (see reconcile_members) instead of holding on_ready back
+    # until every guild is chunked; the presence goes out with IDENTIFY and survives reconnects
+    chunk_guilds_at_startup=False,
+    status=discord.Status.online,
+    activity=discord.Streaming(
+        name="Accessed by ꧁• RON •꧂",
+        url="https://www.twitch.tv/yourchannel"  # Replace with your Twitch or YouTube URL
+    )
 )
 bot.state = BotState()
 
+@bot.tree.error
+async def on_app_command_error(interaction, error):
+    # Hybrid commands report through on_command_error; this only sees what fails in the tree itself
+    if interaction.command:
+        COMMANDS_TOTAL.inc(interaction.command.qualified_name, command_error_outcome(error))
+    await app_commands.CommandTree.on_error(bot.tree, interaction, error)
+
+metrics.add(Gauge("clanbot_gateway_latency_seconds", "Heartbeat latency averaged over shards.", lambda: bot.latency))
+metrics.add(Gauge("clanbot_first_board_render_seconds", "Seconds from READY to the first board render of this process.",
+                  lambda: bot.state.first_render_seconds if bot.state.first_render_seconds is not None else float("nan")))
+
+@bot.check
+async def guild_owned_here(ctx):
+    # Every process on a shard sees every command; with a shared status store only the
+    # one holding the guild's lease handles it, so it replies and writes once
+    if ctx.guild and not status_store.owns_guild(ctx.guild.id):
+        raise NotGuildOwner()
+    return True
+
+def command_error_outcome(error):
+    if isinstance(error, commands.HybridCommandError):
+        error = error.original
+    if isinstance(error, (commands.CheckFailure, app_commands.CheckFailure)):
+        return "check_failed"
+    if isinstance(error, (commands.UserInputError, app_commands.TransformerError)):
+        return "bad_argument"
+    return "error"
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def record_command_metrics(ctx):
+    name = ctx.command.qualified_name
+    elapsed = time.perf_counter() - getattr(ctx, "started_at", time.perf_counter())
+    COMMANDS_TOTAL.inc(name, "error" if ctx.command_failed else "ok")
+    ctx.metrics_recorded = True
+    COMMAND_SECONDS.observe(elapsed, name)
+    if event_trace.enabled:
+        event_trace.command(ctx, elapsed)
+
 # --- Database Helpers ---
-def load_from_db():
-    with sqlite3.connect('status_data.db') as conn:
-        c = conn.cursor()
-        c.execute("SELECT user_id, status FROM user_statuses")
-        bot.state.user_statuses.update({row[0]: row[1] for row in c.fetchall()})
-
-def save_to_db(user_id, status):
-    with sqlite3.connect('status_data.db') as conn:
-        c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO user_statuses (user_id, status) VALUES (?, ?)", (user_id, status))
-        conn.commit()
-
-def remove_from_db(user_id):
-    with sqlite3.connect('status_data.db') as conn:
-        c = conn.cursor()
-        c.execute("DELETE FROM user_statuses WHERE user_id = ?", (user_id,))
-        conn.commit()
+def _adopt_home_guild(conn, guild_id):
+    # Give the original clan's guild the legacy constants and any pre-guild statuses
+    conn.execute("INSERT OR IGNORE INTO guild_config (guild_id, status_channel_id, birthday_channel_id, birthday_role_id) VALUES (?, ?, ?, ?)",
+                 (guild_id, STATUS_CHANNEL_ID, BIRTHDAY_CHANNEL_ID, BIRTHDAY_ROLE_ID))
+    conn.execute("UPDATE OR IGNORE user_statuses SET guild_id = ? WHERE guild_id = 0", (guild_id,))
+    conn.execute("DELETE FROM user_statuses WHERE guild_id = 0")
+
+def _execute_in(conn, sql, ids, *params):
+    # Runs sql once per 500 of `ids` to stay under SQLite's bound-parameter limit; its
+    # "{ids}" becomes the placeholders of a chunk, bound after `params`
+    rows = []
+    ids = list(ids)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows.extend(conn.execute(sql.format(ids=",".join("?" * len(chunk))), (*params, *chunk)))
+    return rows
+
+def _load_state(conn, guild_ids):
+    c = conn.cursor()
+    configs = _execute_in(conn, "SELECT guild_id, status_channel_id, birthday_channel_id, birthday_role_id FROM guild_config WHERE guild_id IN ({ids})", guild_ids)
+    c.execute("SELECT channel_id, message_id FROM board_messages")
+    board_messages = dict(c.fetchall())
+    board_pages = {}
+    for channel_id, page, message_id, content_hash in c.execute("SELECT channel_id, page, message_id, content_hash FROM board_pages"):
+        board_pages.setdefault(channel_id, []).append((page, message_id, content_hash))
+    return configs, board_messages, board_pages
+
+def _load_statuses(conn, guild_ids=None):
+    # All stored statuses when guild_ids is None
+    if guild_ids is None:
+        return conn.execute("SELECT guild_id, user_id, status, display_name, since, expires_at FROM user_statuses").fetchall()
+    return _execute_in(conn, "SELECT guild_id, user_id, status, display_name, since, expires_at FROM user_statuses WHERE guild_id IN ({ids})", guild_ids)
+
+def _load_auto_status(conn, guild_ids):
+    return _execute_in(conn, "SELECT guild_id, user_id, applied_status, applied_at FROM auto_status WHERE guild_id IN ({ids})", guild_ids)
+
+async def load_from_db(guilds=None):
+    home_channel = bot.get_channel(STATUS_CHANNEL_ID)
+    if home_channel:
+        await db.run(_adopt_home_guild, home_channel.guild.id)
+
+    if status_store.shared:
+        await status_store.seed_from_sqlite()
+    guilds = bot.guilds if guilds is None else guilds
+    guild_ids = [guild.id for guild in guilds]
+    configs, board_messages, board_pages = await db.run(_load_state, guild_ids)
+    statuses = await status_store.load(guild_ids)
+    for guild_id, status_channel_id, birthday_channel_id, birthday_role_id in configs:
+        guild_state = bot.state.for_guild(guild_id)
+        guild_state.status_channel_id = status_channel_id
+        guild_state.birthday_channel_id = birthday_channel_id
+        guild_state.birthday_role_id = birthday_role_id
+        guild_state.status_message_id = board_messages.get(status_channel_id)
+        for page, message_id, content_hash in board_pages.get(status_channel_id, ()):
+            guild_state.board_pages[page] = message_id
+            guild_state.board_hashes[page] = content_hash
+        if BOARD_MODE == "pages" and "header" not in guild_state.board_pages and guild_state.status_message_id:
+            # Switching from the single board: its message becomes the header page
+            guild_state.board_pages["header"] = guild_state.status_message_id
+    for guild_id, user_id, status, display_name, since, expires_at in statuses:
+        # Members missing from a cold cache keep their stored name; departed members
+        # are removed by the member events and the periodic reconciliation, never here
+        guild = bot.get_guild(guild_id)
+        member = guild and guild.get_member(user_id)
+        name = member.display_name if member else display_name or str(user_id)
+        guild_state = bot.state.for_guild(guild_id)
+        guild_state.user_statuses.set(user_id, status, name)
+        if since:
+            guild_state.status_since[user_id] = since
+        if expires_at:
+            guild_state.status_expires[user_id] = expires_at
+            expiry_scheduler.schedule(guild_id, user_id, expires_at)
+        if name != display_name:
+            save_to_db(guild_id, user_id, status, name, since, expires_at)
+    if PRESENCE_AUTO_STATUS:
+        for guild_id, user_id, applied_status, applied_at in await db.run(_load_auto_status, guild_ids):
+            auto_status.opt_in(bot.state.for_guild(guild_id), user_id, applied_status and (applied_status, applied_at))
+    # Statuses whose deadline passed while the bot was down are cleared before the first render
+    expiry_scheduler.run_due()
+
+def save_guild_config(guild_state):
+    db.write(("guild_config", guild_state.guild_id),
+             "INSERT OR REPLACE INTO guild_config (guild_id, status_channel_id, birthday_channel_id, birthday_role_id) VALUES (?, ?, ?, ?)",
+             (guild_state.guild_id, guild_state.status_channel_id, guild_state.birthday_channel_id, guild_state.birthday_role_id))
+
+def save_to_db(guild_id, user_id, status, display_name, since=None, expires_at=None):
+    status_store.save(guild_id, user_id, status, display_name, since, expires_at)
+
+def save_auto_status(guild_id, user_id, applied=None):
+    status, applied_at = applied or (None, None)
+    db.write(("auto_status", guild_id, user_id),
+             "INSERT OR REPLACE INTO auto_status (guild_id, user_id, applied_status, applied_at) VALUES (?, ?, ?, ?)",
+             (guild_id, user_id, status, applied_at))
+
+def save_birthday(guild_id, user_id, month, day):
+    db.write(("birthday", guild_id, user_id), "INSERT OR REPLACE INTO birthdays (guild_id, user_id, month, day) VALUES (?, ?, ?, ?)",
+             (guild_id, user_id, month, day))
+
+def remove_birthday(guild_id, user_id):
+    db.write(("birthday", guild_id, user_id), "DELETE FROM birthdays WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+
+def _get_birthday(conn, guild_id, user_id):
+    return conn.execute("SELECT month, day FROM birthdays WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone()
+
+def _load_birthdays_on(conn, dates):
+    rows = []
+    for month, day in dates:
+        rows.extend(conn.execute("SELECT guild_id, user_id FROM birthdays WHERE month = ? AND day = ?", (month, day)))
+    return rows
+
+def remove_from_db(guild_id, user_id):
+    status_store.remove(guild_id, user_id)
+
+def _day_spans(start, end):
+    # Splits [start, end) into (UTC day, seconds) pieces so rollups stay per-day exact
+    while start < end:
+        day_start = datetime.fromtimestamp(start, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        day_end = (day_start + timedelta(days=1)).timestamp()
+        yield day_start.date().isoformat(), min(end, day_end) - start
+        start = day_end
+
+def record_transition(guild_id, user_id, old_status, new_status, since, now):
+    db.append("INSERT INTO status_events (guild_id, user_id, old_status, new_status, at) VALUES (?, ?, ?, ?, ?)",
+              (guild_id, user_id, old_status, new_status, now))
+    if old_status and since:
+        for day, seconds in _day_spans(since, now):
+            db.append('''INSERT INTO status_rollups (guild_id, user_id, day, status, seconds) VALUES (?, ?, ?, ?, ?)
+                         ON CONFLICT (guild_id, user_id, day, status) DO UPDATE SET seconds = seconds + excluded.seconds''',
+                      (guild_id, user_id, day, old_status, seconds))
+
+def _delete_statuses(conn, guild_id, user_ids):
+    _execute_in(conn, "DELETE FROM user_statuses WHERE guild_id = ? AND user_id IN ({ids})", user_ids, guild_id)
+
+def save_board_message(channel_id, message_id):
+    db.write(("board_messages", channel_id), "INSERT OR REPLACE INTO board_messages (channel_id, message_id) VALUES (?, ?)", (channel_id, message_id))
+
+def save_board_page(channel_id, page, message_id, content_hash):
+    db.write(("board_pages", channel_id, page), "INSERT OR REPLACE INTO board_pages (channel_id, page, message_id, content_hash) VALUES (?, ?, ?, ?)",
+             (channel_id, page, message_id, content_hash))
+
+def remove_board_page(channel_id, page):
+    db.write(("board_pages", channel_id, page), "DELETE FROM board_pages WHERE channel_id = ? AND page = ?", (channel_id, page))
+
+# --- Status Store ---
+# Member statuses are persisted through one of these backends. Every process still reads
+# from its own StatusIndex; the store decides where writes go, what a process loads at
+# startup and, when it is shared, which process owns each guild's board. Events, rollups,
+# guild configs and board message IDs always stay in the SQLite database.
+class StatusStore(ABC):
+    shared = False  # Other processes read and write the same statuses
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def load(self, guild_ids):
+        # -> [(guild_id, user_id, status, display_name, since, expires_at)]
+        ...
+
+    @abstractmethod
+    def save(self, guild_id, user_id, status, display_name, since, expires_at):
+        ...
+
+    @abstractmethod
+    def remove(self, guild_id, user_id):
+        ...
+
+    async def remove_many(self, guild_id, user_ids):
+        for user_id in user_ids:
+            self.remove(guild_id, user_id)
+
+    async def claim(self, guild_ids):
+        # Takes the board of these guilds over where nobody else holds it; -> guilds gained
+        return set()
+
+    def owns_guild(self, guild_id):
+        return True
+
+    def healthy(self):
+        return True
+
+    def stats(self):
+        return {"backend": type(self).__name__}
+
+class MemoryStatusStore(StatusStore):
+    def __init__(self):
+        self.rows = {}  # (guild_id, user_id) -> (status, display_name, since, expires_at)
+
+    async def load(self, guild_ids):
+        guild_ids = set(guild_ids)
+        return [(guild_id, user_id, *row) for (guild_id, user_id), row in self.rows.items() if guild_id in guild_ids]
+
+    def save(self, guild_id, user_id, status, display_name, since, expires_at):
+        self.rows[(guild_id, user_id)] = (status, display_name, since, expires_at)
+
+    def remove(self, guild_id, user_id):
+        self.rows.pop((guild_id, user_id), None)
+
+class SQLiteStatusStore(StatusStore):
+    # Writes go through the write-behind queue, keyed per member so bursts collapse
+    async def load(self, guild_ids):
+        return await db.run(_load_statuses, guild_ids)
+
+    def save(self, guild_id, user_id, status, display_name, since, expires_at):
+        db.write(("user_statuses", guild_id, user_id),
+                 "INSERT OR REPLACE INTO user_statuses (guild_id, user_id, status, display_name, since, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                 (guild_id, user_id, status, display_name, since, expires_at))
+
+    def remove(self, guild_id, user_id):
+        db.write(("user_statuses", guild_id, user_id), "DELETE FROM user_statuses WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+
+    async def remove_many(self, guild_id, user_ids):
+        await db.run(_delete_statuses, guild_id, user_ids)
+
+class RespError(Exception):
+    pass
+
+class RespConnection:
+    # Just enough of the Redis protocol (RESP2) for pipelined commands and a pub/sub
+    # subscription; works against Redis, Valkey, KeyDB and benchmarks/fake_redis.py
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._lock = asyncio.Lock()  # One pipeline on the wire at a time
+
+    @classmethod
+    async def open(cls, url, timeout=5):
+        parsed = urllib.parse.urlsplit(url)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(
+            parsed.hostname or "localhost", parsed.port or 6379, ssl=True if parsed.scheme == "rediss" else None), timeout)
+        conn = cls(reader, writer)
+        try:
+            if parsed.password:
+                await conn.command("AUTH", *([parsed.username] if parsed.username else []), urllib.parse.unquote(parsed.password))
+            if parsed.path.strip("/") not in ("", "0"):
+                await conn.command("SELECT", parsed.path.strip("/"))
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    async def execute(self, *commands):
+        # Sends every command in one write and reads the replies back in order
+        async with self._lock:
+            self.writer.write(b"".join(self._encode(args) for args in commands))
+            await self.writer.drain()
+            replies = [await self.read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    async def command(self, *args):
+        return (await self.execute(args))[0]
+
+    async def read_reply(self):
+        line = await self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection to the status store closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            return RespError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            return None if size < 0 else (await self.reader.readexactly(size + 2))[:-2]
+        if kind == b"*":
+            size = int(body)
+            return None if size < 0 else [await self.read_reply() for _ in range(size)]
+        raise ConnectionError(f"Unexpected reply from the status store: {line[:50]!r}")
+
+    def close(self):
+        self.writer.close()
+
+    @staticmethod
+    def _encode(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+_STORE_ERRORS = (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, RespError)
+
+# Statuses live in one hash per guild (user ID -> JSON row). Changes are collected for
+# flush_interval and written as one MULTI/EXEC pipeline that also publishes them, so the
+# other processes apply them to their indexes without reading anything back. A process
+# renders a guild's board, answers its commands and expires its statuses only while it
+# holds that guild's lease key; the others stay in sync and take over when it lapses.
+class RedisStatusStore(StatusStore):
+    shared = True
+    # Lease checks and changes run server-side so nothing can happen between them: a
+    # lease that lapsed and went to another process is never extended or deleted by us.
+    # The first line names the script for benchmarks/fake_redis.py.
+    CLAIM_LEASE_SCRIPT = """-- clanbot:claim-lease
+if redis.call("SET", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) then return 1 end
+if redis.call("GET", KEYS[1]) == ARGV[1] then return redis.call("PEXPIRE", KEYS[1], ARGV[2]) end
+return 0"""
+    RELEASE_LEASE_SCRIPT = """-- clanbot:release-lease
+if redis.call("GET", KEYS[1]) == ARGV[1] then return redis.call("DEL", KEYS[1]) end
+return 0"""
+
+    def __init__(self, url, prefix, flush_interval, lease_seconds):
+        self.url = url
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.lease_seconds = lease_seconds
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(4).hex()}"  # Tags our own published changes
+        self.channel = f"{prefix}:status-changes"
+        self._conn = None
+        self._pending = {}  # (guild_id, user_id) -> row, or None for a removal; last write wins
+        self._wakeup = asyncio.Event()
+        self._owned = set()
+        self._lease_until = 0.0  # Monotonic time our leases run out if the next renewal fails
+        self._tasks = []
+        self._lease_task = None
+        # Store statistics
+        self.batches_written = 0
+        self.changes_written = 0
+        self.remote_changes = 0
+
+    def _status_key(self, guild_id):
+        return f"{self.prefix}:statuses:{guild_id}"
+
+    def _lease_key(self, guild_id):
+        return f"{self.prefix}:board-owner:{guild_id}"
+
+    async def _connection(self):
+        if self._conn is None:
+            self._conn = await RespConnection.open(self.url)
+        return self._conn
+
+    def _drop_connection(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    async def start(self):
+        # Subscribe before anything is loaded so no change can fall between the two
+        await self._connection()
+        subscriber = await RespConnection.open(self.url)
+        await subscriber.command("SUBSCRIBE", self.channel)
+        self._tasks = [asyncio.create_task(self._run_writer()), asyncio.create_task(self._run_subscriber(subscriber))]
+        logger.info(f"Status store: {self.url.rsplit('@', 1)[-1]} as {self.origin}")
+
+    async def close(self):
+        for task in self._tasks + [self._lease_task]:
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        try:
+            await self._flush()
+            if self._owned:
+                # Hand the boards over right away instead of after the lease runs out
+                owned = list(self._owned)
+                self._owned = set()
+                conn = await self._connection()
+                await conn.execute(*(("EVAL", self.RELEASE_LEASE_SCRIPT, 1, self._lease_key(guild_id), self.origin) for guild_id in owned))
+        except _STORE_ERRORS as e:
+            logger.error(f"Status store shutdown left {len(self._pending)} change(s) unwritten: {e}")
+        self._drop_connection()
+
+    async def load(self, guild_ids):
+        guild_ids = list(guild_ids)
+        rows = []
+        conn = await self._connection()
+        for i in range(0, len(guild_ids), 500):
+            chunk = guild_ids[i:i + 500]
+            for guild_id, fields in zip(chunk, await conn.execute(*(("HGETALL", self._status_key(guild_id)) for guild_id in chunk))):
+                for user_id, value in zip(fields[0::2], fields[1::2]):
+                    rows.append((guild_id, int(user_id), *json.loads(value)))
+        return rows
+
+    async def seed_from_sqlite(self):
+        # First start against this store: carry the statuses over from the database,
+        # without overwriting anything another process stored already
+        meta_key = f"status_store_seeded:{self.prefix}"
+        if await db.run(_get_meta, meta_key):
+            return
+        rows = await db.run(_load_statuses)
+        conn = await self._connection()
+        for i in range(0, len(rows), 1000):
+            await conn.execute(*(("HSETNX", self._status_key(guild_id), user_id, json.dumps([status, display_name, since, expires_at]))
+                                 for guild_id, user_id, status, display_name, since, expires_at in rows[i:i + 1000]))
+        save_meta(meta_key, self.origin)
+        logger.info(f"Copied {len(rows)} status(es) from {DB_PATH} into the shared status store.")
+
+    def save(self, guild_id, user_id, status, display_name, since, expires_at):
+        self._pending[(guild_id, user_id)] = [status, display_name, since, expires_at]
+        self._wakeup.set()
+
+    def remove(self, guild_id, user_id):
+        self._pending[(guild_id, user_id)] = None
+        self._wakeup.set()
+
+    async def remove_many(self, guild_id, user_ids):
+        for user_id in user_ids:
+            self._pending[(guild_id, user_id)] = None
+        await self._flush()
+
+    async def _run_writer(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.flush_interval)  # Let the rest of a burst join the pipeline
+            self._wakeup.clear()
+            if not await self._flush():
+                await asyncio.sleep(STORE_RETRY_SECONDS)
+
+    async def _flush(self):
+        changes, self._pending = list(self._pending.items()), {}
+        if not changes:
+            return True
+        written = 0
+        try:
+            conn = await self._connection()
+            for written in range(0, len(changes), 500):
+                batch = changes[written:written + 500]
+                await conn.execute(*self._batch_commands(batch))
+                self.batches_written += 1
+                self.changes_written += len(batch)
+        except _STORE_ERRORS as e:
+            # Requeue what did not go out, unless a newer change replaced it meanwhile
+            for key, row in changes[written:]:
+                self._pending.setdefault(key, row)
+            self._wakeup.set()
+            self._drop_connection()
+            logger.warning(f"Status store write failed ({len(self._pending)} change(s) queued): {e}")
+            return False
+        return True
+
+    def _batch_commands(self, changes):
+        sets, deletes = {}, {}
+        for (guild_id, user_id), row in changes:
+            if row is None:
+                deletes.setdefault(guild_id, []).append(user_id)
+            else:
+                sets.setdefault(guild_id, []).extend((user_id, json.dumps(row)))
+        message = json.dumps({"origin": self.origin, "changes": [[guild_id, user_id, row] for (guild_id, user_id), row in changes]})
+        return [("MULTI",),
+                *(("HSET", self._status_key(guild_id), *fields) for guild_id, fields in sets.items()),
+                *(("HDEL", self._status_key(guild_id), *user_ids) for guild_id, user_ids in deletes.items()),
+                ("PUBLISH", self.channel, message),
+                ("EXEC",)]
+
+    async def _run_subscriber(self, conn):
+        while True:
+            try:
+                while True:
+                    reply = await conn.read_reply()
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        self._apply(reply[2])
+            except _STORE_ERRORS as e:
+                logger.warning(f"Status store subscription lost: {e}. Reconnecting in {STORE_RETRY_SECONDS} s.")
+            finally:
+                conn.close()
+            while True:
+                await asyncio.sleep(STORE_RETRY_SECONDS)
+                conn = None
+                try:
+                    conn = await RespConnection.open(self.url)
+                    await conn.command("SUBSCRIBE", self.channel)
+                    # Whatever was published while we were away is gone; reload instead
+                    await resync_statuses()
+                    break
+                except _STORE_ERRORS as e:
+                    if conn:
+                        conn.close()
+                    self._drop_connection()  # The command connection most likely went down too
+                    logger.warning(f"Status store still unreachable: {e}")
+
+    def _apply(self, data):
+        try:
+            message = json.loads(data)
+            if message["origin"] == self.origin:
+                return
+            changes = message["changes"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed status store message: {e}")
+            return
+        self.remote_changes += len(changes)
+        for change in changes:
+            # One bad change must not end the subscription task and with it all syncing
+            try:
+                guild_id, user_id, row = change
+                if (guild_id, user_id) not in self._pending:  # Our own newer write wins and is published next
+                    apply_remote_status(guild_id, user_id, row)
+            except Exception as e:
+                logger.warning(f"Ignoring malformed status store change {str(change)[:200]}: {e}")
+
+    async def claim(self, guild_ids):
+        # Takes free leases and pushes back the expiry of the ones we hold, in one pipeline
+        # of CLAIM_LEASE_SCRIPT. The first claim starts the renewal loop.
+        guild_ids = list(guild_ids)
+        started = time.monotonic()
+        ttl_ms = int(self.lease_seconds * 1000)
+        conn = await self._connection()
+        replies = await conn.execute(*(("EVAL", self.CLAIM_LEASE_SCRIPT, 1, self._lease_key(guild_id), self.origin, ttl_ms) for guild_id in guild_ids))
+        owned = {guild_id for guild_id, held in zip(guild_ids, replies) if held == 1}
+        gained, lost = owned - self._owned, self._owned - owned
+        self._owned, self._lease_until = owned, started + self.lease_seconds
+        if lost:
+            logger.warning(f"Another process took over the board of {len(lost)} guild(s): {sorted(lost)}")
+        if self._lease_task is None:
+            self._lease_task = asyncio.create_task(self._run_leases())
+        return gained
+
+    async def _run_leases(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                gained = await self.claim([guild.id for guild in bot.guilds])
+            except _STORE_ERRORS as e:
+                self._drop_connection()
+                logger.warning(f"Board lease renewal failed: {e}")
+                continue
+            if gained:
+                await take_over_boards(gained)
+
+    def owns_guild(self, guild_id):
+        # Stop acting on a lease we could not renew before anyone else can take it
+        return guild_id in self._owned and time.monotonic() < self._lease_until
+
+    def healthy(self):
+        return self._conn is not None and len(self._pending) < HEALTH_MAX_DB_QUEUE
+
+    def stats(self):
+        return {
+            "backend": type(self).__name__,
+            "pending": len(self._pending),
+            "batches_written": self.batches_written,
+            "changes_written": self.changes_written,
+            "remote_changes": self.remote_changes,
+            "owned_guilds": len(self._owned),
+        }
+
+def make_status_store(kind):
+    if kind == "memory":
+        return MemoryStatusStore()
+    if kind == "redis":
+        return RedisStatusStore(REDIS_URL, REDIS_PREFIX, STORE_FLUSH_INTERVAL, BOARD_LEASE_SECONDS)
+    return SQLiteStatusStore()
+
+status_store = make_status_store(STATUS_STORE)
 
 # --- Status Board Update Function ---
-async def update_status_board():
-    channel = bot.get_channel(STATUS_CHANNEL_ID)
+async def update_status_board(guild_state):
+    if not guild_state.status_channel_id:
+        return  # Board not set up in this guild yet (see `AC setup`)
+    channel = bot.get_channel(guild_state.status_channel_id)
     if not channel:
-        logger.error(f"Status channel {STATUS_CHANNEL_ID} not found. Please ensure the bot is in the guild and has access to this channel.")
-        # Log available channels for debugging
-        for guild in bot.guilds:
-            logger.info(f"Guild: {guild.name} (ID: {guild.id})")
-            channels = [f"{ch.name} (ID: {ch.id})" for ch in guild.channels]
-            logger.info(f"Available channels in {guild.name}: {', '.join(channels)}")
+        logger.error(f"Status channel {guild_state.status_channel_id} of guild {guild_state.guild_id} not found. Please ensure the bot has access to this channel.")
         return
 
     # Check bot permissions in the status channel before proceeding
     perms = channel.permissions_for(channel.guild.me)
-    if not perms.send_messages or not perms.embed_links or not perms.read_message_history:
+    if not perms.send_messages or not perms.embed_links:
         missing_perms = []
         if not perms.send_messages: missing_perms.append("Send Messages")
         if not perms.embed_links: missing_perms.append("Embed Links")
-        if not perms.read_message_history: missing_perms.append("Read Message History")
-        logger.error(f"Bot lacks required permissions in status channel {STATUS_CHANNEL_ID}: {', '.join(missing_perms)}")
+        logger.error(f"Bot lacks required permissions in status channel {channel.id}: {', '.join(missing_perms)}")
+        return
+
+    if BOARD_MODE == "pages":
+        try:
+            await _update_board_pages(guild_state, channel)
+        except discord.Forbidden as e:
+            logger.error(f"Bot lacks permissions to send messages or embed links in status channel {channel.id}: {e}", exc_info=True)
+        except Exception as e:
+            logger.error(f"Critical error updating status board pages: {e}", exc_info=True)
         return
 
     # Create the status board embed
-    embed = discord.Embed(
-        title="🌟 ～ꗥ❀ 𝐀𝐑𝐀𝐒𝐇𝐈𝐊𝐀𝐆𝐄 𝐂𝐋𝐀𝐍 ❀ꗥ～ Status Board",
-        description=(
-            "✨ **Welcome to the Arashikage Clan Status Hub!** ✨\n"
-            "Here’s what our members are up to—whether they’re diving into studies, taking a breather, or out exploring the world! "
-            "Set your status with commands like `AC srn`, `AC b`, or `AC f` to let everyone know your vibe! 🌈"
-        ),
-        color=discord.Color.from_rgb(147, 112, 219),  # Soft purple color
-        timestamp=datetime.now(timezone.utc)
-    )
-    embed.set_thumbnail(url=bot.user.avatar.url if bot.user.avatar else bot.user.default_avatar.url)
-    embed.set_footer(text="Set your status with AC srn, AC b, AC dl, AC f, AC s, or AC o! 🌟 • Updates in real-time!")
+    render_started = time.perf_counter()
+    fields = list(guild_state.user_statuses.fields())
+    # The hash covers what the members see change; the "Last Updated" stamp is left out
+    content_hash = _content_hash(status_catalog.commands_text, *(f"{name}\x1e{value}" for name, value in fields))
+    if guild_state.status_message_id and guild_state.board_hashes.get("board") == content_hash:
+        BOARD_EDITS_SKIPPED.inc("unchanged")
+        return
 
-    if not bot.state.user_statuses:
+    embed = _board_header_embed()
+    if not fields:
         embed.add_field(
             name="📖 No Statuses Yet",
             value="It’s quiet in the clan... Be the first to set your status! Use `AC srn`, `AC b`, or others to share what you’re up to! 🖋️",
             inline=False
         )
     else:
-        # Sort users by display name for consistent ordering
-        # Ensure user objects are fetched if not in cache (get_user might return None)
-        active_users = []
-        for user_id, status in list(bot.state.user_statuses.items()): # Use list() for safe iteration during modification
-            user = bot.get_user(user_id)
-            if user:
-                active_users.append((user, status))
-            else:
-                # Clean up if user is no longer in the server or not found
-                bot.state.user_statuses.pop(user_id, None)
-                remove_from_db(user_id)
-                logger.info(f"Removed non-existent user {user_id} from status board.")
-
-        sorted_statuses = sorted(
-            active_users,
-            key=lambda item: item[0].display_name.lower()
-        )
-
-        # Group statuses by category for a more organized display
-        status_groups = {
-            "Studying Right Now 📚": [],
-            "On a Break ☕": [],
-            "Do Later ⏰": [],
-            "Free to Chat 🟢": [],
-            "Sleeping 😴": [],
-            "Outside 🚶": []
-        }
-
-        for user, status in sorted_statuses:
-            status_groups[status].append(user)
-
-        # Add grouped statuses to the embed
-        for status, users in status_groups.items():
-            if users:
-                emoji = (
-                    "📚" if "Studying" in status else
-                    "☕" if "Break" in status else
-                    "⏰" if "Do Later" in status else
-                    "🟢" if "Free" in status else
-                    "😴" if "Sleeping" in status else
-                    "🚶" if "Outside" in status else "🌟"
-                )
-                user_list = ", ".join(user.display_name for user in users[:10])  # Limit to 10 users per field
-                if len(users) > 10:
-                    user_list += f" + {len(users) - 10} more"
-                embed.add_field(
-                    name=f"{emoji} {status.split(' ')[0]} ({len(users)})",
-                    value=user_list,
-                    inline=True
-                )
+        # Groups come pre-sorted from the index; only changed groups are re-joined
+        for name, value in fields:
+            embed.add_field(name=name, value=value, inline=True)
 
     # Add a summary field
-    total_members = len(bot.state.user_statuses)
+    total_members = len(guild_state.user_statuses)
     embed.add_field(
         name="📊 Clan Activity Summary",
         value=f"**Total Members with Status:** {total_members}\n"
@@ -189,188 +1707,824 @@ async def update_status_board():
         inline=False
     )
 
+    BOARD_RENDER_SECONDS.observe(time.perf_counter() - render_started)
+
     # Update or send the status message
     try:
-        if bot.state.status_message:
+        BOARD_EDITS_SENT.inc()
+        if guild_state.status_message_id:
+            # Edit through a partial message so no fetch round-trip is needed
             try:
-                fetched_message = await channel.fetch_message(bot.state.status_message.id)
-                if fetched_message:
-                    await fetched_message.edit(embed=embed)
-                    bot.state.status_message = fetched_message
-                else: # Message deleted, send a new one
-                    bot.state.status_message = await channel.send(embed=embed)
+                await channel.get_partial_message(guild_state.status_message_id).edit(embed=embed)
+                guild_state.board_hashes["board"] = content_hash
+                return
             except discord.NotFound: # Message was deleted by someone else
-                bot.state.status_message = await channel.send(embed=embed)
-            except discord.Forbidden:
-                logger.error(f"Bot lacks permission to edit status message in {channel.id}. Attempting to send new one.")
-                bot.state.status_message = await channel.send(embed=embed)
-            except Exception as e:
-                logger.error(f"Error editing status message: {e}. Sending new one.", exc_info=True)
-                bot.state.status_message = await channel.send(embed=embed)
-        else:
-            # Try to find an existing status board message by the bot
-            found_existing = False
+                logger.info(f"Status board message {guild_state.status_message_id} is gone. Sending a new one.")
+        elif perms.read_message_history:
+            # No board on record yet (first run after upgrading): adopt an existing board once
             async for msg in channel.history(limit=50): # Look back 50 messages
                 if msg.author == bot.user and msg.embeds and \
                    msg.embeds[0].title == "🌟 ～ꗥ❀ 𝐀𝐑𝐀𝐒𝐇𝐈𝐊𝐀𝐆𝐄 𝐂𝐋𝐀𝐍 ❀ꗥ～ Status Board":
-                    bot.state.status_message = msg
                     await msg.edit(embed=embed)
-                    found_existing = True
-                    break
-            if not found_existing:
-                bot.state.status_message = await channel.send(embed=embed)
+                    guild_state.status_message_id = msg.id
+                    guild_state.board_hashes["board"] = content_hash
+                    save_board_message(channel.id, msg.id)
+                    return
+
+        message = await channel.send(embed=embed)
+        guild_state.status_message_id = message.id
+        guild_state.board_hashes["board"] = content_hash
+        save_board_message(channel.id, message.id)
 
     except discord.Forbidden as e:
         logger.error(f"Bot lacks permissions to send messages or embed links in status channel {channel.id}: {e}", exc_info=True)
     except Exception as e:
         logger.error(f"Critical error updating status board: {e}", exc_info=True)
 
-# --- Status Commands with Creative Auto-Responders ---
-@bot.hybrid_command(name="srn", description="Set status to Studying Right Now")
-async def set_studying(ctx):
-    old_status = bot.state.user_statuses.get(ctx.author.id, None)
-    bot.state.user_statuses[ctx.author.id] = "Studying Right Now 📚"
-    save_to_db(ctx.author.id, "Studying Right Now 📚")
+def _content_hash(*parts):
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=8).hexdigest()
 
-    # Creative auto-responder
-    if old_status == "Studying Right Now 📚":
-        response = f"📚 Wow, {ctx.author.mention}, you’re a study machine! Still deep in the books—keep that brain buzzing! 🧠✨"
-    elif old_status in ["Free to Chat 🟢", "On a Break ☕"]:
-        response = f"📖 Switching gears, {ctx.author.mention}! You’re now **Studying Right Now**—time to conquer those chapters! 🚀📚"
-    elif old_status == "Sleeping 😴":
-        response = f"📚 Fresh from a nap, {ctx.author.mention}? You’re now **Studying Right Now**—let’s hit those books with full energy! ⚡"
-    else:
-        response = f"📚 Locked in, {ctx.author.mention}! You’re now **Studying Right Now**—may your focus be as sharp as a ninja! 🥷✨"
-
-    # Send response and delete messages
-    bot_response = await ctx.send(response)
-    await ctx.message.delete(delay=5)  # Delete user's message after 5 seconds
-    await bot_response.delete(delay=10)  # Delete bot's response after 10 seconds
-    await update_status_board()
+def _board_header_embed():
+    embed = discord.Embed(
+        title="🌟 ～ꗥ❀ 𝐀𝐑𝐀𝐒𝐇𝐈𝐊𝐀𝐆𝐄 𝐂𝐋𝐀𝐍 ❀ꗥ～ Status Board",
+        description=(
+            "✨ **Welcome to the Arashikage Clan Status Hub!** ✨\n"
+            "Here’s what our members are up to—whether they’re diving into studies, taking a breather, or out exploring the world! "
+            "Set your status with commands like `AC srn`, `AC b`, or `AC f` to let everyone know your vibe! 🌈"
+        ),
+        color=discord.Color.from_rgb(147, 112, 219),  # Soft purple color
+        timestamp=datetime.now(timezone.utc)
+    )
+    embed.set_thumbnail(url=bot.user.avatar.url if bot.user.avatar else bot.user.default_avatar.url)
+    embed.set_footer(text=f"Set your status with {status_catalog.commands_text}! 🌟 • Updates in real-time!")
+    return embed
+
+async def _update_board_pages(guild_state, channel):
+    # Pages mode: one message for the header and one per status group, plus overflow
+    # pages once a group outgrows BOARD_PAGE_SIZE. Every group has a page from the first
+    # post on, so a status change only re-renders the groups it left and joined, and a
+    # page whose content hash is unchanged is not edited at all.
+    render_started = time.perf_counter()
+    index = guild_state.user_statuses
+    header = _board_header_embed()
+    pages = {"header": (header.title, header.description, header.footer.text)}
+    for status in index.statuses():
+        texts = index.pages(status, BOARD_PAGE_SIZE) or [""]
+        label = f"{status_catalog.emoji(status)} {status_catalog.name(status)}"
+        for n, text in enumerate(texts):
+            title = f"{label} ({index.count(status)})" if n == 0 else f"{label} (cont.)"
+            pages[f"{status}:{n}"] = (title, text or "Nobody right now.")
+
+    hashes = {key: _content_hash(*content) for key, content in pages.items()}
+    stale = [key for key in guild_state.board_pages if key not in pages]
+    BOARD_RENDER_SECONDS.observe(time.perf_counter() - render_started)
+
+    # Messages are shown in the order they were sent, so a page that has to be sent (an
+    # overflow page, a new group, a deleted message) also moves every page after it
+    # to the bottom: those are sent again and their old messages deleted.
+    replaced = []
+    reposting = False
+    previous_id = 0
+    for key, (title, description, *_) in pages.items():
+        content_hash = hashes[key]
+        message_id = guild_state.board_pages.get(key)
+        reposting = reposting or not message_id or message_id < previous_id
+        if not reposting and guild_state.board_hashes.get(key) == content_hash:
+            BOARD_EDITS_SKIPPED.inc("unchanged")
+            previous_id = message_id
+            continue
+        if key == "header":
+            embed = header
+        else:
+            embed = discord.Embed(title=title, description=description, color=discord.Color.from_rgb(147, 112, 219), timestamp=datetime.now(timezone.utc))
+        BOARD_EDITS_SENT.inc()
+        if not reposting:
+            try:
+                await channel.get_partial_message(message_id).edit(embed=embed)
+            except discord.NotFound: # Message was deleted by someone else
+                logger.info(f"Board page {key} ({message_id}) is gone. Sending a new one.")
+                reposting, message_id = True, None
+        if reposting:
+            if message_id:
+                replaced.append(message_id)
+            message_id = (await channel.send(embed=embed)).id
+        guild_state.board_pages[key] = message_id
+        guild_state.board_hashes[key] = content_hash
+        save_board_page(channel.id, key, message_id, content_hash)
+        previous_id = message_id
+
+    # Overflow pages a group no longer needs, and the messages of moved pages
+    for key in stale:
+        replaced.append(guild_state.board_pages.pop(key))
+        guild_state.board_hashes.pop(key, None)
+        remove_board_page(channel.id, key)
+    for message_id in replaced:
+        try:
+            await channel.get_partial_message(message_id).delete()
+        except discord.NotFound:
+            pass
+
+# --- Background Tasks ---
+# The schedulers below each own one task, started by the first piece of work queued on
+# them. Shutdown is the same for all of them: cancel the task, wait for it to finish,
+# then _drain() whatever it left behind.
+class BackgroundTask(ABC):
+    def __init__(self):
+        self._task = None
 
-@bot.hybrid_command(name="b", description="Set status to On a Break")
-async def set_break(ctx):
-    old_status = bot.state.user_statuses.get(ctx.author.id, None)
-    bot.state.user_statuses[ctx.author.id] = "On a Break ☕"
-    save_to_db(ctx.author.id, "On a Break ☕")
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
 
-    # Creative auto-responder
-    if old_status == "On a Break ☕":
-        response = f"☕ Another break, {ctx.author.mention}? You’re living the chill life—grab a snack and soak in the vibes! 🍵😎"
-    elif old_status == "Studying Right Now 📚":
-        response = f"☕ Time for a breather, {ctx.author.mention}! You’re now **On a Break**—kick back and recharge your ninja spirit! 🌟"
-    elif old_status == "Sleeping 😴":
-        response = f"☕ Up from your slumber, {ctx.author.mention}? You’re now **On a Break**—let’s sip some tea and ease into the day! 🍵"
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self._drain()
+
+    async def _drain(self):
+        pass
+
+    @abstractmethod
+    async def _run(self):
+        ...
+
+# --- Board Refresh Scheduler ---
+# Commands never edit the board themselves: they mark it dirty and a single background
+# task renders it. A burst of status changes collapses into at most one edit per
+# BOARD_REFRESH_INTERVAL, and since every render reads the current state, the last
+# change of a burst always makes it onto the board.
+class BoardRefresher(BackgroundTask):
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self._dirty = asyncio.Event()
+        self._dirty_guilds = set()
+        self._in_flight = set()
+        self._lock = asyncio.Lock()
+
+    def mark_dirty(self, guild_id):
+        board_feed.notify(guild_id)  # API viewers follow every change, not only the rendered ones
+        if guild_id in self._dirty_guilds:
+            BOARD_EDITS_SKIPPED.inc("coalesced")
+        self._dirty_guilds.add(guild_id)
+        self._dirty.set()
+        self.start()
+
+    async def flush(self, guild_ids=None):
+        # Render right away, bypassing the debounce window (startup and shutdown)
+        guild_ids = set(bot.state.guilds) if guild_ids is None else set(guild_ids)
+        self._dirty_guilds -= guild_ids
+        async with self._lock:
+            await self._render(guild_ids)
+
+    async def _drain(self):
+        # Render once more where a change is still pending or an edit was interrupted
+        pending = self._dirty_guilds | self._in_flight
+        if pending:
+            await self.flush(pending)
+
+    async def _render(self, guild_ids):
+        # Guilds render concurrently; each board lives in its own channel and rate-limit bucket.
+        # With a shared status store only the process holding a guild's lease edits its board.
+        guild_ids = {guild_id for guild_id in guild_ids if status_store.owns_guild(guild_id)}
+        self._in_flight |= guild_ids
+        results = await asyncio.gather(
+            *(update_status_board(bot.state.for_guild(guild_id)) for guild_id in guild_ids),
+            return_exceptions=True
+        )
+        for guild_id, result in zip(guild_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Board refresh failed for guild {guild_id}: {result}", exc_info=result)
+        self._in_flight -= guild_ids
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            guild_ids, self._dirty_guilds = self._dirty_guilds, set()
+            async with self._lock:
+                await self._render(guild_ids)
+            await asyncio.sleep(self.interval)
+
+board_refresher = BoardRefresher(BOARD_REFRESH_INTERVAL)
+
+# --- Outbound Actions ---
+# Command chatter (the invoking message and the bot's reply) is not deleted through a
+# timer task per message. The queue keeps every pending delete with its due time and a
+# single worker removes what has come due in a channel with one bulk delete, so during
+# a status rush the cleanup of dozens of commands collapses into a few REST calls.
+class OutboundQueue(BackgroundTask):
+    def __init__(self, batch_window):
+        super().__init__()
+        self.batch_window = batch_window
+        self._deletes = {}  # channel_id -> [(due, message), ...]
+        self._wakeup = asyncio.Event()
+
+    def delete_later(self, message, delay):
+        self._deletes.setdefault(message.channel.id, []).append((time.monotonic() + delay, message))
+        self._wakeup.set()
+        self.start()
+
+    async def _drain(self):
+        # Whatever is still queued goes out right away
+        pending, self._deletes = self._deletes, {}
+        await asyncio.gather(*(self._delete(channel_id, [message for _, message in entries]) for channel_id, entries in pending.items()))
+
+    def _hold(self, channel_id):
+        return max(rate_limits.delay("POST", f"/channels/{channel_id}/messages/bulk-delete"),
+                   rate_limits.delay("DELETE", f"/channels/{channel_id}/messages/0"))
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_run = None
+            batches = []
+            for channel_id, entries in list(self._deletes.items()):
+                # The first due message waits up to batch_window for others to join it
+                ready_at = min(due for due, _ in entries) + self.batch_window
+                hold = self._hold(channel_id)
+                if hold and ready_at <= now:
+                    OUTBOUND_DEFERRED.inc()
+                    ready_at = now + hold
+                if ready_at > now:
+                    next_run = ready_at if next_run is None else min(next_run, ready_at)
+                    continue
+                due_now = [message for due, message in entries if due <= now]
+                remaining = [(due, message) for due, message in entries if due > now]
+                if remaining:
+                    self._deletes[channel_id] = remaining
+                else:
+                    del self._deletes[channel_id]
+                batches.append(self._delete(channel_id, due_now))
+            if batches:
+                await asyncio.gather(*batches)
+                continue
+            # asyncio.wait rather than wait_for: a stop() that lands together with a
+            # wakeup must not have its cancellation swallowed
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=None if next_run is None else max(0.0, next_run - time.monotonic()))
+            finally:
+                waiter.cancel()
+
+    async def _delete(self, channel_id, messages):
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            return  # The channel is gone and its messages with it
+        guild = getattr(channel, "guild", None)
+        can_bulk = guild is not None and channel.permissions_for(guild.me).manage_messages
+        if not can_bulk:
+            # Without Manage Messages only the bot's own replies can be removed
+            messages = [message for message in messages if message.author.id == bot.user.id]
+        for i in range(0, len(messages), 100):
+            chunk = messages[i:i + 100]
+            if can_bulk and len(chunk) > 1:
+                rate_limits.spend("POST", f"/channels/{channel_id}/messages/bulk-delete")
+                try:
+                    await channel.delete_messages(chunk)
+                    OUTBOUND_DELETES.inc("bulk", amount=len(chunk))
+                    continue
+                except discord.HTTPException as e:
+                    logger.warning(f"Bulk delete of {len(chunk)} messages in channel {channel_id} failed, deleting one by one: {e}")
+            for message in chunk:
+                rate_limits.spend("DELETE", f"/channels/{channel_id}/messages/{message.id}")
+                try:
+                    await message.delete()
+                    OUTBOUND_DELETES.inc("single")
+                except discord.NotFound:
+                    pass  # Already deleted by someone else
+                except discord.HTTPException as e:
+                    logger.warning(f"Could not delete message {message.id} in channel {channel_id}: {e}")
+
+outbound = OutboundQueue(OUTBOUND_BATCH_WINDOW)
+
+async def respond(ctx, content=None, *, delete_after=10, **kwargs):
+    # Slash invocations get an ephemeral reply: only the invoker sees it and nothing has
+    # to be deleted. Prefix invocations queue the command and the reply for cleanup.
+    if ctx.interaction:
+        await ctx.send(content, ephemeral=True, **kwargs)
+        return
+    bot_response = await ctx.send(content, **kwargs)
+    outbound.delete_later(ctx.message, 5)  # Delete user's message after 5 seconds
+    outbound.delete_later(bot_response, delete_after)  # Delete bot's response after `delete_after` seconds
+
+# --- Deadline Scheduling ---
+# Per-member deadlines of every guild share one heap of (deadline, guild_id, user_id) and
+# one task that sleeps until the earliest deadline. A moved or cancelled deadline leaves
+# its entry behind; on_due skips it when it comes up because the member's current
+# deadline no longer matches. Deadlines that fall within batch_window of each other are
+# handed to on_due together, so their boards are refreshed once.
+class DeadlineScheduler(BackgroundTask):
+    def __init__(self, on_due, batch_window=0.0):
+        super().__init__()
+        self.on_due = on_due  # on_due([(deadline, guild_id, user_id), ...], now)
+        self.batch_window = batch_window
+        self._heap = []
+        self._wakeup = asyncio.Event()
+
+    def schedule(self, guild_id, user_id, deadline):
+        heapq.heappush(self._heap, (deadline, guild_id, user_id))
+        if self._heap[0][0] == deadline:
+            self._wakeup.set()  # New earliest deadline
+        self.start()
+
+    def run_due(self):
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now + self.batch_window:
+            due.append(heapq.heappop(self._heap))
+        return self.on_due(due, now) if due else None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            self.run_due()
+            timeout = max(0.0, self._heap[0][0] - time.time()) if self._heap else None
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=timeout)
+            finally:
+                waiter.cancel()
+
+# --- Status Expiry ---
+def expire_statuses(due, now):
+    expired = {}
+    for deadline, guild_id, user_id in due:
+        guild_state = bot.state.guilds.get(guild_id)
+        if guild_state is None or guild_state.status_expires.get(user_id) != deadline:
+            continue  # Superseded by a later change
+        # Where another process owns the guild it stores and logs the expiry; here it is only mirrored
+        clear_member_status(guild_state, discord.Object(user_id), at=min(deadline, now), persist=status_store.owns_guild(guild_id))
+        expired[guild_id] = expired.get(guild_id, 0) + 1
+    if expired:
+        STATUSES_EXPIRED.inc(amount=sum(expired.values()))
+        logger.info(f"Expired {sum(expired.values())} status(es) in {len(expired)} guild(s).")
+    return expired
+
+expiry_scheduler = DeadlineScheduler(expire_statuses, EXPIRY_BATCH_WINDOW)
+
+# --- Status Changes ---
+# Every status change goes through these helpers so the index, the database,
+# the event log and the board stay in step.
+def set_member_status(guild_state, member, status):
+    index = guild_state.user_statuses
+    old_status = index.set(member.id, status, member.display_name)
+    now = time.time()
+    if old_status != status:
+        since = guild_state.status_since.get(member.id)
+        guild_state.status_since[member.id] = now
+        record_transition(guild_state.guild_id, member.id, old_status, status, since, now)
+    # Setting a status again restarts its TTL
+    ttl = status_catalog.ttls.get(status)
+    if ttl:
+        guild_state.status_expires[member.id] = now + ttl
+        expiry_scheduler.schedule(guild_state.guild_id, member.id, now + ttl)
     else:
-        response = f"☕ Break time, {ctx.author.mention}! You’re now **On a Break**—unwind and let the good vibes flow! 🌈"
-
-    bot_response = await ctx.send(response)
-    await ctx.message.delete(delay=5)
-    await bot_response.delete(delay=10)
-    await update_status_board()
-
-@bot.hybrid_command(name="dl", description="Set status to Do Later")
-async def set_do_later(ctx):
-    old_status = bot.state.user_statuses.get(ctx.author.id, None)
-    bot.state.user_statuses[ctx.author.id] = "Do Later ⏰"
-    save_to_db(ctx.author.id, "Do Later ⏰")
-
-    # Creative auto-responder
-    if old_status == "Do Later ⏰":
-        response = f"⏰ Still on the ‘later’ train, {ctx.author.mention}? No worries—procrastination is an art form! 🎨😉"
-    elif old_status == "Studying Right Now 📚":
-        response = f"⏰ Taking a step back, {ctx.author.mention}? You’re now **Do Later**—plan your next move like a true strategist! 🗒️"
-    elif old_status == "Free to Chat 🟢":
-        response = f"⏰ Postponing the fun, {ctx.author.mention}? You’re now **Do Later**—we’ll catch up when the time’s right! ⏳"
+        guild_state.status_expires.pop(member.id, None)
+    save_to_db(guild_state.guild_id, member.id, status, member.display_name, guild_state.status_since.get(member.id), guild_state.status_expires.get(member.id))
+    board_refresher.mark_dirty(guild_state.guild_id)
+    return old_status
+
+def _end_status(guild_state, user_id, at, persist):
+    old_status = guild_state.user_statuses.remove(user_id)
+    if old_status is not None:
+        since = guild_state.status_since.pop(user_id, None)
+        guild_state.status_expires.pop(user_id, None)  # A pending expiry is skipped as superseded
+        if persist:
+            record_transition(guild_state.guild_id, user_id, old_status, None, since, at)
+        board_refresher.mark_dirty(guild_state.guild_id)
+    return old_status
+
+def clear_member_status(guild_state, member, at=None, persist=True):
+    # `at` backdates the end of the status (an expiry applied late), for the rollups
+    old_status = _end_status(guild_state, member.id, at or time.time(), persist)
+    if old_status is not None and persist:
+        remove_from_db(guild_state.guild_id, member.id)
+    return old_status
+
+async def remove_departed_members(guild_state, user_ids, persist=True):
+    # Members who left: their sessions all end at the same moment and the store
+    # drops them in one batch
+    at = time.time()
+    departed = [user_id for user_id in user_ids if _end_status(guild_state, user_id, at, persist) is not None]
+    if departed and persist:
+        await status_store.remove_many(guild_state.guild_id, departed)
+    return departed
+
+def apply_remote_status(guild_id, user_id, row):
+    # A change another process made and stored already: mirror it into this process's
+    # index without writing or logging it a second time. `row` is None for a removal.
+    if bot.get_guild(guild_id) is None:
+        return  # Not on our shards
+    guild_state = bot.state.for_guild(guild_id)
+    index = guild_state.user_statuses
+    if row is None:
+        if index.remove(user_id) is None:
+            return
+        guild_state.status_since.pop(user_id, None)
+        guild_state.status_expires.pop(user_id, None)
     else:
-        response = f"⏰ You’re now **Do Later**, {ctx.author.mention}! Take your time—good things come to those who wait! 🕰️"
-
-    bot_response = await ctx.send(response)
-    await ctx.message.delete(delay=5)
-    await bot_response.delete(delay=10)
-    await update_status_board()
-
-@bot.hybrid_command(name="f", description="Set status to Free to Chat")
-async def set_free(ctx):
-    old_status = bot.state.user_statuses.get(ctx.author.id, None)
-    bot.state.user_statuses[ctx.author.id] = "Free to Chat 🟢"
-    save_to_db(ctx.author.id, "Free to Chat 🟢")
+        status, display_name, since, expires_at = row
+        display_name = display_name or str(user_id)
+        if (index.get(user_id), index.name(user_id), guild_state.status_since.get(user_id),
+                guild_state.status_expires.get(user_id)) == (status, display_name, since, expires_at):
+            return
+        index.set(user_id, status, display_name)
+        for values, value in ((guild_state.status_since, since), (guild_state.status_expires, expires_at)):
+            if value:
+                values[user_id] = value
+            else:
+                values.pop(user_id, None)
+        if expires_at:
+            expiry_scheduler.schedule(guild_id, user_id, expires_at)
+    board_refresher.mark_dirty(guild_id)
+
+async def resync_statuses(guild_ids=None):
+    # Brings the indexes back in line with the shared store after notifications were missed
+    guild_ids = list(bot.state.guilds) if guild_ids is None else list(guild_ids)
+    stored = {}
+    for guild_id, user_id, *row in await status_store.load(guild_ids):
+        stored.setdefault(guild_id, {})[user_id] = row
+    for guild_id in guild_ids:
+        rows = stored.get(guild_id, {})
+        guild_state = bot.state.guilds.get(guild_id)
+        for user_id, _ in list(guild_state.user_statuses.items()) if guild_state else ():
+            if user_id not in rows:
+                apply_remote_status(guild_id, user_id, None)
+        for user_id, row in rows.items():
+            apply_remote_status(guild_id, user_id, row)
+
+async def take_over_boards(guild_ids):
+    # Another process stopped renewing its leases: reload what it stored last, expire
+    # what ran out in the meantime and re-render, since its last edits are unknown here
+    logger.info(f"Took over the board of {len(guild_ids)} guild(s): {sorted(guild_ids)}")
+    await resync_statuses(guild_ids)
+    for guild_id in guild_ids:
+        bot.state.for_guild(guild_id).board_hashes.clear()
+        board_refresher.mark_dirty(guild_id)
 
-    # Creative auto-responder
-    if old_status == "Free to Chat 🟢":
-        response = f"🟢 Still vibin’, {ctx.author.mention}? You’re free as a bird—let’s chat or team up for something epic! 🐦✨"
-    elif old_status in ["Studying Right Now 📚", "Do Later ⏰"]:
-        response = f"🟢 Task mode off, {ctx.author.mention}! You’re now **Free to Chat**—time to connect with the clan! 🌟"
-    elif old_status == "Outside 🚶":
-        response = f"🟢 Back from your adventure, {ctx.author.mention}? You’re now **Free to Chat**—spill the tea on your outing! ☕"
-    else:
-        response = f"🟢 You’re now **Free to Chat**, {ctx.author.mention}! The clan’s ready to vibe with you—let’s make some memories! 🎉"
+# --- Status Commands with Creative Auto-Responders ---
+# One hybrid command per catalog entry. The callback only keeps the key, so renames
+# and new responses take effect without re-registering the command.
+def _status_command(definition):
+    key = definition["key"]
+
+    async def set_status(ctx):
+        guild_state = bot.state.for_guild(ctx.guild.id)
+        old_status = set_member_status(guild_state, ctx.author, key)
+        await respond(ctx, status_catalog.response(old_status, key, ctx.author.mention))
+
+    return commands.hybrid_command(name=key, description=definition["description"])(commands.guild_only()(set_status))
+
+async def apply_status_catalog(catalog, sync=True):
+    # Swaps in a new catalog: (re)registers the commands whose key or description
+    # changed, drops the ones that left, and re-sorts every board. With `sync`, only the
+    # affected slash commands are upserted or deleted, never the whole tree.
+    global status_catalog
+    old_catalog, status_catalog = status_catalog, catalog
+    changed = []
+    for key, definition in catalog.definitions.items():
+        old_definition = old_catalog.definitions.get(key)
+        if bot.get_command(key) is None or old_definition is None or old_definition["description"] != definition["description"]:
+            bot.remove_command(key)
+            bot.add_command(_status_command(definition))
+            changed.append(key)
+    removed = [key for key in old_catalog.definitions if key not in catalog.definitions]
+    for key in removed:
+        bot.remove_command(key)
+    for guild_id, guild_state in bot.state.guilds.items():
+        guild_state.user_statuses.reorder(catalog.definitions)
+        board_refresher.mark_dirty(guild_id)
+
+    if sync and bot.application_id and (changed or removed):
+        try:
+            for key in changed:
+                await bot.http.upsert_global_command(bot.application_id, bot.get_command(key).app_command.to_dict(bot.tree))
+            if removed:
+                for app_command in await bot.tree.fetch_commands():
+                    if app_command.name in removed:
+                        await app_command.delete()
+            save_meta(f"command_tree_hash:{bot.application_id}", command_tree_hash())
+            logger.info(f"Status catalog applied: upserted {changed or 'no'} and deleted {removed or 'no'} slash commands.")
+        except discord.HTTPException as e:
+            logger.error(f"Failed to update slash commands for the status catalog: {e}", exc_info=True)
+    return changed, removed
+
+for _definition in DEFAULT_STATUSES:
+    bot.add_command(_status_command(_definition))
 
-    bot_response = await ctx.send(response)
-    await ctx.message.delete(delay=5)
-    await bot_response.delete(delay=10)
-    await update_status_board()
+@bot.hybrid_command(name="cs", description="Clear your current status")
+@commands.guild_only()
+async def clear_status(ctx):
+    guild_state = bot.state.for_guild(ctx.guild.id)
+    if ctx.author.id not in guild_state.user_statuses:
+        response = f"🤔 You haven’t set a status yet, {ctx.author.mention}! Let’s get started—try `AC srn`, `AC b`, or another command! 🌟"
+        await respond(ctx, response)
+        return
 
-@bot.hybrid_command(name="s", description="Set status to Sleeping")
-async def set_sleeping(ctx):
-    old_status = bot.state.user_statuses.get(ctx.author.id, None)
-    bot.state.user_statuses[ctx.author.id] = "Sleeping 😴"
-    save_to_db(ctx.author.id, "Sleeping 😴")
+    clear_member_status(guild_state, ctx.author)
 
     # Creative auto-responder
-    if old_status == "Sleeping 😴":
-        response = f"😴 Still lost in dreamland, {ctx.author.mention}? Keep snoozing—we’ll guard the clan while you rest! 🌙"
-    elif old_status == "Free to Chat 🟢":
-        response = f"😴 Calling it a day, {ctx.author.mention}? You’re now **Sleeping**—drift off to a world of dreams! 💤"
-    elif old_status == "On a Break ☕":
-        response = f"😴 From break to bed, {ctx.author.mention}! You’re now **Sleeping**—rest well, ninja! 🌟"
-    else:
-        response = f"😴 You’re now **Sleeping**, {ctx.author.mention}! May your dreams be filled with epic clan adventures! 🌌"
-
-    bot_response = await ctx.send(response)
-    await ctx.message.delete(delay=5)
-    await bot_response.delete(delay=10)
-    await update_status_board()
+    response = f"🧹 Status reset, {ctx.author.mention}! You’re a blank slate—set a new vibe with `AC srn`, `AC b`, or others! 🎨"
+    await respond(ctx, response)
+
+# --- Study Stats ---
+# Both commands read the per-day rollups (at most STATS_DAYS rows per member and
+# status) and add the still-running session from memory; the raw event log is never scanned.
+def _stats_window():
+    first_day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=STATS_DAYS - 1)
+    return first_day.date().isoformat(), first_day.timestamp()
+
+def _member_rollups(conn, guild_id, user_id, first_day):
+    return conn.execute("SELECT status, SUM(seconds) FROM status_rollups WHERE guild_id = ? AND user_id = ? AND day >= ? GROUP BY status",
+                        (guild_id, user_id, first_day)).fetchall()
+
+def _status_rollups(conn, guild_id, status, first_day):
+    return conn.execute("SELECT user_id, SUM(seconds) FROM status_rollups WHERE guild_id = ? AND status = ? AND day >= ? GROUP BY user_id",
+                        (guild_id, status, first_day)).fetchall()
+
+def _format_duration(seconds):
+    hours, minutes = divmod(int(seconds // 60), 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
+@bot.hybrid_command(name="stats", description="Show how you spent the last 7 days")
+@commands.guild_only()
+async def show_stats(ctx, member: discord.Member = None):
+    member = member or ctx.author
+    guild_state = bot.state.for_guild(ctx.guild.id)
+    first_day, window_start = _stats_window()
+    totals = dict(await db.run(_member_rollups, ctx.guild.id, member.id, first_day))
+    current = guild_state.user_statuses.get(member.id)
+    since = guild_state.status_since.get(member.id)
+    if current and since:
+        totals[current] = totals.get(current, 0) + time.time() - max(since, window_start)
 
-@bot.hybrid_command(name="o", description="Set status to Outside")
-async def set_outside(ctx):
-    old_status = bot.state.user_statuses.get(ctx.author.id, None)
-    bot.state.user_statuses[ctx.author.id] = "Outside 🚶"
-    save_to_db(ctx.author.id, "Outside 🚶")
+    embed = discord.Embed(
+        title=f"📊 {member.display_name}’s Last {STATS_DAYS} Days",
+        color=discord.Color.from_rgb(147, 112, 219),
+        timestamp=datetime.now(timezone.utc)
+    )
+    if not totals:
+        embed.description = f"No status time recorded yet for {member.mention}—set one with `AC srn` and start the clock! ⏱️"
+    for status in sorted(totals, key=lambda s: status_catalog.order.get(s, len(status_catalog.order))):
+        embed.add_field(name=status_catalog.label(status), value=_format_duration(totals[status]), inline=True)
+
+    await respond(ctx, embed=embed, delete_after=30)
+
+@bot.hybrid_command(name="leaderboard", aliases=["lb"], description="Show who studied the most in the last 7 days")
+@commands.guild_only()
+async def show_leaderboard(ctx):
+    status = "srn"
+    guild_state = bot.state.for_guild(ctx.guild.id)
+    first_day, window_start = _stats_window()
+    totals = dict(await db.run(_status_rollups, ctx.guild.id, status, first_day))
+    now = time.time()
+    for user_id in guild_state.user_statuses.members(status):
+        since = guild_state.status_since.get(user_id)
+        if since:
+            totals[user_id] = totals.get(user_id, 0) + now - max(since, window_start)
+    top = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:10]
 
-    # Creative auto-responder
-    if old_status == "Outside 🚶":
-        response = f"🚶 Still exploring, {ctx.author.mention}? The world’s your playground—enjoy every moment out there! 🌍"
-    elif old_status == "Sleeping 😴":
-        response = f"🚶 Awake and adventuring, {ctx.author.mention}! You’re now **Outside**—breathe in the fresh air! ☀️"
-    elif old_status == "Studying Right Now 📚":
-        response = f"🚶 Escaping the books, {ctx.author.mention}? You’re now **Outside**—let nature recharge your soul! 🌳"
+    embed = discord.Embed(
+        title=f"🏆 Study Leaderboard — Last {STATS_DAYS} Days",
+        color=discord.Color.gold(),
+        timestamp=datetime.now(timezone.utc)
+    )
+    if not top:
+        embed.description = "Nobody has logged study time yet—be the first with `AC srn`! 📚"
     else:
-        response = f"🚶 You’re now **Outside**, {ctx.author.mention}! Step into the sunshine and make some memories! 🌞"
-
-    bot_response = await ctx.send(response)
-    await ctx.message.delete(delay=5)
-    await bot_response.delete(delay=10)
-    await update_status_board()
-
-@bot.hybrid_command(name="cs", description="Clear your current status")
-async def clear_status(ctx):
-    if ctx.author.id not in bot.state.user_statuses:
-        response = f"🤔 You haven’t set a status yet, {ctx.author.mention}! Let’s get started—try `AC srn`, `AC b`, or another command! 🌟"
-        bot_response = await ctx.send(response)
-        await ctx.message.delete(delay=5)
-        await bot_response.delete(delay=10)
+        medals = ["🥇", "🥈", "🥉"]
+        lines = []
+        for rank, (user_id, seconds) in enumerate(top):
+            member = ctx.guild.get_member(user_id)
+            name = member.display_name if member else guild_state.user_statuses.name(user_id) or f"<@{user_id}>"
+            lines.append(f"{medals[rank] if rank < 3 else f'**{rank + 1}.**'} {name} — {_format_duration(seconds)}")
+        embed.description = "\n".join(lines)
+
+    await respond(ctx, embed=embed, delete_after=30)
+
+# --- Guild Setup ---
+@bot.hybrid_command(name="setup", description="Choose the status board channel and birthday settings for this server")
+@commands.guild_only()
+@commands.has_guild_permissions(manage_guild=True)
+async def setup_guild(ctx, status_channel: discord.TextChannel, birthday_channel: discord.TextChannel = None, birthday_role: discord.Role = None):
+    guild_state = bot.state.for_guild(ctx.guild.id)
+    if status_channel.id != guild_state.status_channel_id:
+        guild_state.status_channel_id = status_channel.id
+        guild_state.status_message_id = None  # The board moves to the new channel
+        guild_state.board_pages.clear()
+        guild_state.board_hashes.clear()
+    if birthday_channel:
+        guild_state.birthday_channel_id = birthday_channel.id
+    if birthday_role:
+        guild_state.birthday_role_id = birthday_role.id
+    save_guild_config(guild_state)
+    board_refresher.mark_dirty(ctx.guild.id)
+
+    response = f"⚙️ All set, {ctx.author.mention}! The Status Board now lives in {status_channel.mention}."
+    if guild_state.birthday_channel_id and guild_state.birthday_role_id:
+        response += f" Birthday pings for <@&{guild_state.birthday_role_id}> are celebrated in <#{guild_state.birthday_channel_id}>! 🎂"
+    await respond(ctx, response, allowed_mentions=discord.AllowedMentions.none())
+
+# --- Status Catalog Admin ---
+# The catalog is shared by every server, so only the bot owner may change it.
+@bot.hybrid_group(name="status", description="Manage the status catalog (bot owner only)", invoke_without_command=True)
+@commands.is_owner()
+async def status_admin(ctx):
+    await respond(ctx, "🛠️ Use `AC status add <key> <emoji> <name>`, `AC status rename <key> <emoji> <name>`, `AC status ttl <key> <minutes>` or `AC status reload`.")
+
+@status_admin.command(name="add", description="Add a status and its command")
+@commands.is_owner()
+async def status_add(ctx, key: str, emoji: str, *, name: str):
+    key = key.lower()
+    if not STATUS_KEY_RE.fullmatch(key) or bot.get_command(key):
+        await respond(ctx, f"⚠️ `{key}` can’t be used—pick a short, unused command name (letters, digits, `-` or `_`).")
+        return
+    if len(status_catalog.definitions) >= STATUS_CATALOG_MAX:
+        await respond(ctx, f"⚠️ The catalog already holds the maximum of {STATUS_CATALOG_MAX} statuses.")
         return
+    if len(name) > STATUS_NAME_MAX or len(emoji) > STATUS_EMOJI_MAX:
+        await respond(ctx, f"⚠️ Keep the name within {STATUS_NAME_MAX} characters and the emoji within {STATUS_EMOJI_MAX}.")
+        return
+    definition = {"key": key, "name": name, "emoji": emoji, "description": f"Set status to {name}", "help": None, "responses": {}}
+    await db.run(_save_status_definition, definition, len(status_catalog.definitions))
+    await apply_status_catalog(StatusCatalog([*status_catalog.definitions.values(), definition]))
+    await respond(ctx, f"✅ Added **{name}** {emoji}! Members can set it with `AC {key}`.")
+
+@status_admin.command(name="rename", description="Change the name and emoji of a status")
+@commands.is_owner()
+async def status_rename(ctx, key: str, emoji: str, *, name: str):
+    key = key.lower()
+    if key not in status_catalog.definitions:
+        await respond(ctx, f"⚠️ There’s no status `{key}`.")
+        return
+    if len(name) > STATUS_NAME_MAX or len(emoji) > STATUS_EMOJI_MAX:
+        await respond(ctx, f"⚠️ Keep the name within {STATUS_NAME_MAX} characters and the emoji within {STATUS_EMOJI_MAX}.")
+        return
+    definitions = [dict(definition) for definition in status_catalog.definitions.values()]
+    definition = definitions[status_catalog.order[key]]
+    definition.update(name=name, emoji=emoji, description=f"Set status to {name}")
+    await db.run(_save_status_definition, definition, status_catalog.order[key])
+    await apply_status_catalog(StatusCatalog(definitions))
+    await respond(ctx, f"✏️ `AC {key}` now sets **{name}** {emoji}.")
+
+@status_admin.command(name="ttl", description="Make a status clear itself after some minutes (0 turns it off)")
+@commands.is_owner()
+async def status_ttl(ctx, key: str, minutes: float):
+    key = key.lower()
+    if key not in status_catalog.definitions or minutes < 0:
+        await respond(ctx, f"⚠️ There’s no status `{key}`." if minutes >= 0 else "⚠️ Minutes can’t be negative.")
+        return
+    definitions = [dict(definition) for definition in status_catalog.definitions.values()]
+    definition = definitions[status_catalog.order[key]]
+    definition["ttl"] = minutes * 60 or None
+    await db.run(_save_status_definition, definition, status_catalog.order[key])
+    await apply_status_catalog(StatusCatalog(definitions))
+    if minutes:
+        await respond(ctx, f"⏳ **{definition['name']}** now clears itself {minutes:g} minutes after it’s set (from the next time it’s set).")
+    else:
+        await respond(ctx, f"⏳ **{definition['name']}** no longer clears itself (from the next time it’s set).")
+
+@status_admin.command(name="reload", description="Reload the status catalog from the database")
+@commands.is_owner()
+async def status_reload(ctx):
+    changed, removed = await apply_status_catalog(StatusCatalog(await db.run(_load_status_catalog)))
+    await respond(ctx, f"🔄 Reloaded {len(status_catalog.definitions)} statuses ({len(changed)} commands updated, {len(removed)} removed).")
+
+# --- Presence Auto-Status ---
+# Members who opt in (`AC auto on`) get their status from their Discord presence: going
+# offline or idle sets the mapped status, and coming back clears it again if it is still
+# the one set automatically; a status the member picked by hand is never replaced.
+# Presence updates are the noisiest gateway event, so the handler turns everyone else
+# away with one dict lookup. A change only lands once the presence has held for the
+# enter or leave delay (flickering back cancels it), and never sooner than min_hold after
+# the previous automatic change. Due changes come from a DeadlineScheduler, as status
+# expiries do, and go through set_member_status/clear_member_status.
+class PresenceAutoStatus:
+    def __init__(self, mapping, enter_delay, leave_delay, min_hold):
+        self.mapping = mapping  # presence ("offline", "idle", "dnd") -> status key
+        self.enter_delay = enter_delay
+        self.leave_delay = leave_delay
+        self.min_hold = min_hold
+        self.users = {}  # user_id -> number of guilds they opted in to; the pre-filter
+        self._pending = {}  # (guild_id, user_id) -> (status key, or None to clear, due time)
+        self._applied = {}  # (guild_id, user_id) -> (status key set automatically, unix time)
+        self.scheduler = DeadlineScheduler(self.apply_due)
+
+    def opt_in(self, guild_state, user_id, applied=None):
+        if user_id not in guild_state.auto_status:
+            guild_state.auto_status.add(user_id)
+            self.users[user_id] = self.users.get(user_id, 0) + 1
+        if applied:
+            self._applied[(guild_state.guild_id, user_id)] = applied
+
+    def opt_out(self, guild_state, user_id):
+        if user_id in guild_state.auto_status:
+            guild_state.auto_status.discard(user_id)
+            self.users[user_id] -= 1
+            if not self.users[user_id]:
+                del self.users[user_id]
+        self._pending.pop((guild_state.guild_id, user_id), None)
+        self._applied.pop((guild_state.guild_id, user_id), None)
+
+    def observe(self, guild_state, user_id, presence):
+        key = (guild_state.guild_id, user_id)
+        target = self.mapping.get(presence)
+        current = guild_state.user_statuses.get(user_id)
+        applied = self._applied.get(key)
+        if target is None:
+            delay = self.leave_delay
+            if applied is None or current != applied[0]:
+                target = False  # Nothing of ours to undo
+        else:
+            delay = self.enter_delay
+            if current == target or not self._replaceable(current, applied):
+                target = False  # Already there, or a status the member picked themselves
+        pending = self._pending.get(key)
+        if target is False:
+            if self._pending.pop(key, None):
+                AUTO_STATUS_SUPPRESSED.inc()
+            return
+        if pending and pending[0] == target:
+            return  # Already waiting for this change; its clock keeps running
+        now = time.time()
+        if applied:
+            delay = max(delay, applied[1] + self.min_hold - now)
+        self._pending[key] = (target, now + delay)
+        self.scheduler.schedule(guild_state.guild_id, user_id, now + delay)
+
+    def _replaceable(self, current, applied):
+        return current is None or (applied is not None and current == applied[0])
+
+    def apply_due(self, due_changes, now):
+        for due, guild_id, user_id in due_changes:
+            key = (guild_id, user_id)
+            pending = self._pending.get(key)
+            if pending is None or pending[1] != due:
+                continue  # Cancelled or superseded
+            del self._pending[key]
+            guild_state = bot.state.guilds.get(guild_id)
+            guild = bot.get_guild(guild_id)
+            member = guild and guild.get_member(user_id)
+            if guild_state is None or member is None or user_id not in guild_state.auto_status or not status_store.owns_guild(guild_id):
+                continue
+            status = pending[0]
+            if status is None:
+                applied = self._applied.pop(key, None)
+                if applied and guild_state.user_statuses.get(user_id) == applied[0]:
+                    clear_member_status(guild_state, member)
+                    AUTO_STATUS_CHANGES.inc("clear")
+            elif not self._replaceable(guild_state.user_statuses.get(user_id), self._applied.get(key)):
+                continue  # The member set a status in the meantime
+            elif status in status_catalog.definitions:
+                set_member_status(guild_state, member, status)
+                self._applied[key] = (status, now)
+                AUTO_STATUS_CHANGES.inc("set")
+            else:
+                logger.warning(f"PRESENCE_STATUS_MAP names status {status}, which is not in the catalog.")
+                continue
+            save_auto_status(guild_id, user_id, self._applied.get(key))
 
-    del bot.state.user_statuses[ctx.author.id]
-    remove_from_db(ctx.author.id)
+auto_status = PresenceAutoStatus(PRESENCE_STATUS_MAP, PRESENCE_ENTER_DELAY, PRESENCE_LEAVE_DELAY, PRESENCE_MIN_HOLD)
 
-    # Creative auto-responder
-    response = f"🧹 Status reset, {ctx.author.mention}! You’re a blank slate—set a new vibe with `AC srn`, `AC b`, or others! 🎨"
-    bot_response = await ctx.send(response)
-    await ctx.message.delete(delay=5)
-    await bot_response.delete(delay=10)
-    await update_status_board()
+@bot.event
+async def on_presence_update(before, after):
+    # Dispatched per guild for every presence change of every member; anyone who has not
+    # opted in somewhere is dropped before anything else is looked at
+    if after.id not in auto_status.users or before.status == after.status:
+        return
+    guild_state = bot.state.guilds.get(after.guild.id)
+    if guild_state and after.id in guild_state.auto_status:
+        auto_status.observe(guild_state, after.id, str(after.status))
+
+@bot.hybrid_command(name="auto", description="Let your Discord presence set your status (on or off)")
+@commands.guild_only()
+async def auto_status_command(ctx, mode: str = None):
+    if not PRESENCE_AUTO_STATUS:
+        await respond(ctx, "⚠️ Auto-status isn’t switched on for this bot.")
+        return
+    guild_state = bot.state.for_guild(ctx.guild.id)
+    mode = (mode or ("off" if ctx.author.id in guild_state.auto_status else "on")).lower()
+    if mode not in ("on", "off"):
+        await respond(ctx, "⚠️ Use `AC auto on` or `AC auto off`.")
+        return
+    if mode == "off":
+        auto_status.opt_out(guild_state, ctx.author.id)
+        db.write(("auto_status", ctx.guild.id, ctx.author.id), "DELETE FROM auto_status WHERE guild_id = ? AND user_id = ?", (ctx.guild.id, ctx.author.id))
+        await respond(ctx, f"🔕 Got it, {ctx.author.mention}! Your status is all yours again.")
+        return
+    auto_status.opt_in(guild_state, ctx.author.id)
+    save_auto_status(ctx.guild.id, ctx.author.id)
+    if getattr(ctx.author, "status", None) is not None:
+        auto_status.observe(guild_state, ctx.author.id, str(ctx.author.status))  # Start from the current presence
+    rules = ", ".join(f"{presence} sets **{status_catalog.label(key)}**" for presence, key in auto_status.mapping.items())
+    await respond(ctx, f"🔔 Auto-status on, {ctx.author.mention}! Going {rules}; coming back clears it. (`AC auto off` to stop)")
 
 # --- Help Command ---
 @bot.hybrid_command(name="help", description="Show how to use the Status Board")
@@ -391,14 +2545,30 @@ async def help_command(ctx):
     # Status Commands
     embed.add_field(
         name="📚 Status Commands",
+        value="".join(
+            f"`AC {key}` - Set to **{definition['name']}** {definition['emoji']}" + (f" ({definition['help']})" if definition.get("help") else "") + "\n"
+            for key, definition in status_catalog.definitions.items()
+        ) + "`AC cs` - Clear your status 🧹 (Start fresh!)"
+          + ("\n`AC auto` - Let your Discord presence set your status 🔔 (on/off)" if PRESENCE_AUTO_STATUS else ""),
+        inline=False
+    )
+
+    # Stats Commands
+    embed.add_field(
+        name="📊 Stats Commands",
         value=(
-            "`AC srn` - Set to **Studying Right Now** 📚 (Deep in your studies!)\n"
-            "`AC b` - Set to **On a Break** ☕ (Time for a coffee break!)\n"
-            "`AC dl` - Set to **Do Later** ⏰ (Procrastination mode on!)\n"
-            "`AC f` - Set to **Free to Chat** 🟢 (Ready to hang out!)\n"
-            "`AC s` - Set to **Sleeping** 😴 (Catching some Z’s!)\n"
-            "`AC o` - Set to **Outside** 🚶 (Exploring the great outdoors!)\n"
-            "`AC cs` - Clear your status 🧹 (Start fresh!)"
+            "`AC stats [@member]` - Time spent in each status over the last 7 days ⏱️\n"
+            "`AC leaderboard` - Top studiers of the last 7 days 🏆"
+        ),
+        inline=False
+    )
+
+    # Birthday Commands
+    embed.add_field(
+        name="🎂 Birthday Commands",
+        value=(
+            "`AC birthday set MM-DD` - Register your birthday for the daily announcement 🎉\n"
+            "`AC birthday remove` - Forget your birthday 🗑️"
         ),
         inline=False
     )
@@ -409,155 +2579,645 @@ async def help_command(ctx):
         value=(
             "1. Use a status command (e.g., `AC srn`) to set your status.\n"
             "2. Your status appears on the **Status Board** in the designated channel.\n"
-            "3. Your command message deletes after 5 seconds, and my response vanishes after 10 seconds—keeping things tidy! 🧹\n"
+            "3. Your command message deletes after 5 seconds, and my response vanishes after 10 seconds—keeping things tidy! 🧹 "
+            "Slash commands get a reply only you can see.\n"
             "4. Update or clear your status anytime to keep the clan in the loop! 🌟"
         ),
         inline=False
     )
 
     # Where to Find the Board
-    embed.add_field(
-        name="📍 Where to Find the Status Board",
-        value=(
-            f"Check out the Status Board in <#{STATUS_CHANNEL_ID}>! "
-            "It updates in real-time to reflect the clan’s current vibes. 🌈"
-        ),
-        inline=False
-    )
+    guild_state = bot.state.guilds.get(ctx.guild.id) if ctx.guild else None
+    if guild_state and guild_state.status_channel_id:
+        embed.add_field(
+            name="📍 Where to Find the Status Board",
+            value=(
+                f"Check out the Status Board in <#{guild_state.status_channel_id}>! "
+                "It updates in real-time to reflect the clan’s current vibes. 🌈"
+            ),
+            inline=False
+        )
 
-    bot_response = await ctx.send(embed=embed)
-    await ctx.message.delete(delay=5)
-    await bot_response.delete(delay=10)
+    await respond(ctx, embed=embed)
 
 # --- Event Handlers ---
-@bot.event
-async def on_ready():
-    logger.info(f'Logged in as {bot.user} (ID: {bot.user.id})')
-    # Set bot status to streaming
-    await bot.change_presence(
-        status=discord.Status.online,
-        activity=discord.Streaming(
-            name="Accessed by ꧁• RON •꧂",
-            url="https://www.twitch.tv/yourchannel"  # Replace with your Twitch or YouTube URL
-        )
-    )
-
-    # Log guilds the bot is in for debugging
-    if not bot.guilds:
-        logger.error("Bot is not in any guilds. Please invite the bot to your server.")
+def command_tree_hash():
+    payload = sorted((command.to_dict(bot.tree) for command in bot.tree.get_commands()), key=lambda command: command["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+async def sync_command_tree():
+    # A global sync is slow and rate-limited, so it only runs when the commands changed
+    # since the last successful one
+    meta_key = f"command_tree_hash:{bot.application_id}"
+    tree_hash = command_tree_hash()
+    if await db.run(_get_meta, meta_key) == tree_hash:
+        logger.info("Slash commands unchanged since the last sync. Skipping it.")
         return
-    for guild in bot.guilds:
-        logger.info(f"Connected to guild: {guild.name} (ID: {guild.id})")
-        # Ensure all channels are fetched or cached to prevent "channel not found" errors
-        # for channel in guild.channels: # This line helps populate cache
-        #     pass
-        channels_info = [f"{ch.name} (ID: {ch.id})" for ch in guild.channels]
-        logger.info(f"Channels in {guild.name}: {', '.join(channels_info)}")
-
-
-    # Ensure guilds are fully loaded before proceeding
-    await bot.wait_until_ready()
-
-    load_from_db()
-    # Call update_status_board with a delay to ensure all caches are populated
-    await asyncio.sleep(5) # Small delay to ensure channel cache is ready
-    await update_status_board()
-
     try:
-        # Syncing commands globally might take time or fail if too many guilds
-        # Consider guild-specific sync for testing or larger bots
         synced = await bot.tree.sync() # Syncs global commands
+        save_meta(meta_key, tree_hash)
         logger.info(f"Synced {len(synced)} slash command(s)")
     except Exception as e:
         logger.error(f"Failed to sync commands: {e}", exc_info=True)
 
+@bot.event
+async def on_ready():
+    # Also fires after a reconnect that could not resume; the state in memory is still current then
+    if bot.state.started:
+        logger.info(f"Reconnected as {bot.user}. Startup already done.")
+        return
+    bot.state.started = True
+    ready_at = time.perf_counter()
+    logger.info(f'Logged in as {bot.user} (ID: {bot.user.id}) in {len(bot.guilds)} guild(s)')
+    if not bot.guilds:
+        logger.error("Bot is not in any guilds. Please invite the bot to your server.")
+
+    # Every available guild has its channels cached by now; unavailable ones render
+    # from on_guild_available once Discord sends them
+    await load_from_db()
+    await status_store.claim([guild.id for guild in bot.guilds])
+    await board_refresher.flush([guild.id for guild in bot.guilds if not guild.unavailable])
+    bot.state.first_render_seconds = time.perf_counter() - ready_at
+    logger.info(f"First board render {bot.state.first_render_seconds * 1000:.0f} ms after READY "
+                f"({time.perf_counter() - PROCESS_STARTED:.2f} s after process start).")
+    if not reconcile_members.is_running():
+        reconcile_members.start()
+    if not birthday_announcer.is_running():
+        birthday_announcer.start()
+    event_trace.start(trace_header())
+    if datetime.now(timezone.utc).time() >= BIRTHDAY_POST_TIME.replace(tzinfo=None):
+        await announce_birthdays(catch_up=True)  # Started after today's announcement time
+    await sync_command_tree()
+
+@bot.event
+async def on_guild_available(guild):
+    # A guild that was unavailable at startup (or after an outage) gets its board back
+    if bot.state.started and guild.id in bot.state.guilds:
+        board_refresher.mark_dirty(guild.id)
 
 @bot.event
 async def on_message(message):
     # Ignore messages from the bot itself
     if message.author.bot or message.author == bot.user:
         return
+    if event_trace.enabled:
+        event_trace.message(message)
 
-    # Check if message is in the birthday channel
-    if message.channel.id == BIRTHDAY_CHANNEL_ID:
-        # Check bot's permissions in THIS specific channel
-        perms = message.channel.permissions_for(message.guild.me)
-        if not perms.send_messages or not perms.embed_links:
+    # Check if message is in this guild's birthday channel
+    guild_state = bot.state.guilds.get(message.guild.id) if message.guild else None
+    if (guild_state and guild_state.birthday_role_id and message.channel.id == guild_state.birthday_channel_id
+            and status_store.owns_guild(message.guild.id)):
+        await handle_birthday_message(message, guild_state)
+
+    # Process commands if any
+    await bot.process_commands(message)
+
+# --- Birthday Announcements ---
+# Birthday replies can flood the channel, so the handler runs its cheap checks first
+# (channel ID, precompiled role-mention match, once-per-day dedupe) and only then touches
+# permissions (cached until a channel, role or member update) and members (cache before REST).
+USER_MENTION_RE = re.compile(r'<@!?(\d+)>')
+
+@lru_cache(maxsize=None)
+def _role_mention_re(role_id):
+    return re.compile(rf'<@&{role_id}>')
+
+def _cached_permissions(channel):
+    perms = bot.state.channel_perms.get(channel.id)
+    fresh = perms is None
+    if fresh:
+        perms = bot.state.channel_perms[channel.id] = channel.permissions_for(channel.guild.me)
+    return perms, fresh
+
+def _first_birthday_celebration(guild_id, user_id):
+    today = datetime.now(timezone.utc).date()
+    if bot.state.birthday_day != today:
+        bot.state.birthday_day = today
+        bot.state.birthdays_celebrated.clear()
+    if (guild_id, user_id) in bot.state.birthdays_celebrated:
+        return False
+    bot.state.birthdays_celebrated.add((guild_id, user_id))
+    return True
+
+async def handle_birthday_message(message, guild_state):
+    # Check if message contains birthday role mention
+    if not _role_mention_re(guild_state.birthday_role_id).search(message.content):
+        return
+    # Extract the celebrated user from the first user mention
+    match = USER_MENTION_RE.search(message.content)
+    if not match:
+        return
+    user_id = int(match.group(1))
+    if not _first_birthday_celebration(message.guild.id, user_id):
+        return  # Already celebrated today; replies to the announcement land here
+
+    # Check bot's permissions in THIS specific channel (warned once per permission change)
+    perms, fresh = _cached_permissions(message.channel)
+    if not perms.send_messages or not perms.embed_links:
+        bot.state.birthdays_celebrated.discard((message.guild.id, user_id))
+        if fresh:
             missing_perms = []
             if not perms.send_messages: missing_perms.append("Send Messages")
             if not perms.embed_links: missing_perms.append("Embed Links")
-            logger.error(f"Bot lacks required permissions in birthday channel {BIRTHDAY_CHANNEL_ID}: {', '.join(missing_perms)}")
-            await message.channel.send(f"⚠️ I don't have enough permissions here! Please grant me 'Send Messages' and 'Embed Links' to post birthday messages.")
+            logger.error(f"Bot lacks required permissions in birthday channel {message.channel.id}: {', '.join(missing_perms)}")
+            if perms.send_messages:
+                await message.channel.send(f"⚠️ I don't have enough permissions here! Please grant me 'Send Messages' and 'Embed Links' to post birthday messages.")
+        return
+
+    try:
+        # Prefer the cached member; fetch only if the cache doesn't have them
+        user = message.guild.get_member(user_id) or await message.guild.fetch_member(user_id)
+
+        # Create embed with user's profile picture
+        embed = birthday_embed(user)
+
+        # Log the action
+        logger.info(f"Sending birthday embed for user {user.id} in channel {message.channel.id} (Avatar URL: {user.display_avatar.url})")
+
+        # Send the embed in the birthday channel
+        await message.channel.send(embed=embed)
+        BIRTHDAYS_ANNOUNCED.inc("mention")
+
+    except discord.errors.NotFound as e:
+        logger.error(f"User with ID {user_id} not found in guild {message.guild.id} during birthday message: {e}", exc_info=True)
+        # Optional: Respond to channel if user not found, for debugging
+        await message.channel.send(f"⚠️ Couldn't find the user for that birthday mention. Make sure it's a valid user!")
+    except discord.errors.Forbidden as e:
+        logger.error(f"Bot lacks permissions to send birthday embed in channel {message.channel.id}: {e}", exc_info=True)
+        bot.state.channel_perms.pop(message.channel.id, None)
+    except Exception as e:
+        bot.state.birthdays_celebrated.discard((message.guild.id, user_id))  # Let a later mention retry
+        logger.error(f"Unexpected error sending birthday message for user {user_id}: {e}", exc_info=True)
+        # Optional: General error message
+        await message.channel.send(f"An unexpected error occurred while processing the birthday message for <@{user_id}>.")
+
+# Any of these can change what the bot may do in a channel
+@bot.event
+async def on_guild_channel_update(before, after):
+    bot.state.channel_perms.pop(after.id, None)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    bot.state.channel_perms.pop(channel.id, None)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    bot.state.channel_perms.clear()
+
+@bot.event
+async def on_guild_role_delete(role):
+    bot.state.channel_perms.clear()
+
+# --- Birthday Registry ---
+# Members register their birthday once (`AC birthday set MM-DD`, or a moderator imports a
+# list) and a daily job announces them: one indexed query finds the day's celebrants in
+# every guild, members missing from the cache are resolved with batched gateway chunk
+# requests instead of one fetch each, and each birthday channel gets all of its embeds in
+# as few messages as Discord allows. Celebrations share the once-per-day dedupe with the
+# role-mention handler above, which stays as the fallback for unregistered members.
+BIRTHDAY_ENTRY_RE = re.compile(r'(?:<@!?)?(\d{15,21})>?[\s,;:|]+(\d{1,2})[-/.](\d{1,2})\b')
+BIRTHDAY_IMPORT_MAX_BYTES = 1_000_000
+MAX_EMBEDS_PER_MESSAGE = 10  # Discord's limit
+QUERY_MEMBERS_LIMIT = 100  # User IDs per gateway chunk request
+
+def parse_birthday(text):
+    # "MM-DD" -> (month, day), or None; 02-29 is allowed and celebrated on 02-28 in other years
+    match = re.fullmatch(r'(\d{1,2})[-/.](\d{1,2})', text.strip())
+    if not match:
+        return None
+    try:
+        date = datetime(2000, int(match.group(1)), int(match.group(2)))
+    except ValueError:
+        return None
+    return date.month, date.day
+
+def _birthday_dates(day):
+    dates = [(day.month, day.day)]
+    if day.month == 2 and day.day == 28 and (day + timedelta(days=1)).month == 3:
+        dates.append((2, 29))  # Not a leap year
+    return dates
+
+def birthday_embed(member):
+    embed = discord.Embed(
+        title=f"🎉 Happy Birthday, {member.display_name}! 🎉", # Enhanced title
+        color=discord.Color.purple(),
+        description=f"Wishing a fantastic day to {member.mention}! May your year be filled with joy, success, and epic adventures! 🎂✨"
+    )
+    # Set the image to the member's display avatar (which includes guild avatars)
+    embed.set_image(url=member.display_avatar.url)
+    embed.set_footer(text="Celebrating another trip around the sun with the Arashikage Clan!")
+    return embed
+
+async def _resolve_members(guild, user_ids):
+    members, missing = [], []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member:
+            members.append(member)
+        else:
+            missing.append(user_id)
+    for i in range(0, len(missing), QUERY_MEMBERS_LIMIT):
+        members.extend(await guild.query_members(user_ids=missing[i:i + QUERY_MEMBERS_LIMIT], limit=QUERY_MEMBERS_LIMIT))
+    return members
+
+async def announce_guild_birthdays(guild, guild_state, user_ids):
+    # -> number of birthdays posted, or None if the pass could not finish and should be retried
+    channel = bot.get_channel(guild_state.birthday_channel_id)
+    if channel is None:
+        logger.warning(f"Birthday channel {guild_state.birthday_channel_id} of guild {guild.id} not found.")
+        return None
+    perms, fresh = _cached_permissions(channel)
+    if not perms.send_messages or not perms.embed_links:
+        if fresh:
+            logger.error(f"Bot lacks permissions to announce birthdays in channel {channel.id} of guild {guild.id}.")
+        return None
+    # Marked up front so a role mention arriving meanwhile doesn't celebrate them a second time
+    user_ids = [user_id for user_id in user_ids if _first_birthday_celebration(guild.id, user_id)]
+    sent = set()
+    try:
+        members = await _resolve_members(guild, user_ids) if user_ids else []
+        for i in range(0, len(members), MAX_EMBEDS_PER_MESSAGE):
+            batch = members[i:i + MAX_EMBEDS_PER_MESSAGE]
+            await channel.send(embeds=[birthday_embed(member) for member in batch])
+            sent.update(member.id for member in batch)
+    except Exception as e:
+        for user_id in user_ids:
+            if user_id not in sent:
+                bot.state.birthdays_celebrated.discard((guild.id, user_id))  # Let the role mention still celebrate them
+        if not isinstance(e, discord.HTTPException):
+            raise
+        if isinstance(e, discord.Forbidden):
+            bot.state.channel_perms.pop(channel.id, None)
+        logger.error(f"Could not announce birthdays in channel {channel.id} of guild {guild.id}: {e}")
+        return None
+    finally:
+        if sent:
+            BIRTHDAYS_ANNOUNCED.inc("scheduled", amount=len(sent))
+    return len(sent)
+
+async def announce_birthdays(day=None, catch_up=False):
+    # One pass over the day's registered birthdays in every guild this process owns. A
+    # guild is marked done in bot_meta, so a restart later that day (catch_up) posts only
+    # what was not posted yet, and only marks the rest as celebrated.
+    day = day or datetime.now(timezone.utc).date()
+    celebrants = {}
+    for guild_id, user_id in await db.run(_load_birthdays_on, _birthday_dates(day)):
+        celebrants.setdefault(guild_id, []).append(user_id)
+    posted = 0
+    for guild_id, user_ids in celebrants.items():
+        guild = bot.get_guild(guild_id)
+        guild_state = bot.state.guilds.get(guild_id)
+        if guild is None or guild_state is None or not guild_state.birthday_channel_id or not status_store.owns_guild(guild_id):
+            continue
+        meta_key = f"birthdays_announced:{guild_id}"
+        if catch_up and await db.run(_get_meta, meta_key) == day.isoformat():
+            for user_id in user_ids:
+                _first_birthday_celebration(guild_id, user_id)
+            continue
+        try:
+            sent = await announce_guild_birthdays(guild, guild_state, user_ids)
+        except Exception as e:
+            logger.error(f"Birthday announcement failed for guild {guild_id}: {e}", exc_info=True)
+            continue
+        if sent is None:
+            continue  # Left unmarked, so the next catch-up pass tries again
+        posted += sent
+        save_meta(meta_key, day.isoformat())
+    if posted:
+        logger.info(f"Announced {posted} registered birthday(s) for {day.isoformat()}.")
+    return posted
+
+@tasks.loop(time=BIRTHDAY_POST_TIME)
+async def birthday_announcer():
+    await announce_birthdays()
+
+@bot.hybrid_group(name="birthday", description="Register your birthday for the daily announcement", invoke_without_command=True)
+@commands.guild_only()
+async def birthday_command(ctx):
+    registered = await db.run(_get_birthday, ctx.guild.id, ctx.author.id)
+    if registered:
+        await respond(ctx, f"🎂 Your birthday is registered as **{registered[0]:02d}-{registered[1]:02d}**, {ctx.author.mention}. "
+                           "Change it with `AC birthday set MM-DD` or drop it with `AC birthday remove`.")
+    else:
+        await respond(ctx, "🎂 Register your birthday with `AC birthday set MM-DD` (e.g., `AC birthday set 03-14`) and the clan will celebrate you on the day!")
+
+@birthday_command.command(name="set", description="Register your birthday (MM-DD)")
+@commands.guild_only()
+async def birthday_set(ctx, date: str):
+    parsed = parse_birthday(date)
+    if parsed is None:
+        await respond(ctx, "⚠️ Use month and day as `MM-DD`, e.g., `AC birthday set 03-14`.")
+        return
+    save_birthday(ctx.guild.id, ctx.author.id, *parsed)
+    await respond(ctx, f"🎂 Got it, {ctx.author.mention}! We’ll celebrate you on **{parsed[0]:02d}-{parsed[1]:02d}**. 🎉")
+
+@birthday_command.command(name="remove", description="Remove your registered birthday")
+@commands.guild_only()
+async def birthday_remove(ctx):
+    remove_birthday(ctx.guild.id, ctx.author.id)
+    await respond(ctx, f"🗑️ Your birthday is no longer registered, {ctx.author.mention}.")
+
+@birthday_command.command(name="import", description="Register many birthdays from lines of '@member MM-DD' or a text file")
+@commands.guild_only()
+@commands.has_guild_permissions(manage_guild=True)
+async def birthday_import(ctx, file: discord.Attachment = None, *, entries: str = None):
+    text = entries or ""
+    if file:
+        if file.size > BIRTHDAY_IMPORT_MAX_BYTES:
+            await respond(ctx, "⚠️ That file is too large to import.")
             return
+        text += "\n" + (await file.read()).decode("utf-8", errors="replace")
+    imported = skipped = 0
+    for match in BIRTHDAY_ENTRY_RE.finditer(text):
+        parsed = parse_birthday(f"{match.group(2)}-{match.group(3)}")
+        if parsed is None:
+            skipped += 1
+            continue
+        save_birthday(ctx.guild.id, int(match.group(1)), *parsed)
+        imported += 1
+    if not imported and not skipped:
+        await respond(ctx, "⚠️ Nothing to import. Send one `@member MM-DD` (or `user_id MM-DD`) per line, or attach a file of them.")
+        return
+    response = f"📥 Imported {imported} birthday(s)."
+    if skipped:
+        response += f" Skipped {skipped} with an invalid date."
+    await respond(ctx, response)
+
+# --- Member Lifecycle ---
+# Departures and renames are applied to the status index as the gateway reports them,
+# so rendering the board never has to look members up or clean anything up.
+@bot.event
+async def on_raw_member_remove(payload):
+    guild_state = bot.state.guilds.get(payload.guild_id)
+    # Where another process owns the guild it stores and logs the departure; here it is only mirrored
+    if guild_state and await remove_departed_members(guild_state, [payload.user.id], persist=status_store.owns_guild(payload.guild_id)):
+        logger.info(f"Removed departed member {payload.user.id} from the status board of guild {payload.guild_id}.")
+
+def _sync_display_name(guild_state, member):
+    index = guild_state.user_statuses
+    if member.id in index and index.name(member.id) != member.display_name:
+        index.rename(member.id, member.display_name)
+        save_to_db(guild_state.guild_id, member.id, index.get(member.id), member.display_name,
+                   guild_state.status_since.get(member.id), guild_state.status_expires.get(member.id))
+        board_refresher.mark_dirty(guild_state.guild_id)
 
-        # Check if message contains birthday role mention
-        role_mention = f'<@&{BIRTHDAY_ROLE_ID}>'
-        if role_mention in message.content:
-            # Extract user ID from message using regex
-            user_mention_pattern = r'<@!?(\d+)>'
-            user_ids = re.findall(user_mention_pattern, message.content)
+@bot.event
+async def on_member_update(before, after):
+    if after.id == bot.user.id and before.roles != after.roles:
+        bot.state.channel_perms.clear()  # The bot's own roles changed
+    if before.display_name != after.display_name:
+        guild_state = bot.state.guilds.get(after.guild.id)
+        if guild_state:
+            _sync_display_name(guild_state, after)
 
-            # Filter out role mentions and keep only user mentions
-            user_ids = [uid for uid in user_ids if int(uid) != BIRTHDAY_ROLE_ID]
+@bot.event
+async def on_user_update(before, after):
+    # A global name change shows up in every guild where the member has no nickname
+    if before.display_name != after.display_name:
+        for guild in after.mutual_guilds:
+            guild_state = bot.state.guilds.get(guild.id)
+            member = guild.get_member(after.id)
+            if guild_state and member:
+                _sync_display_name(guild_state, member)
+
+@tasks.loop(minutes=MEMBER_RECONCILE_MINUTES)
+async def reconcile_members():
+    # Safety net for missed events: drop statuses of members who are no longer in the
+    # guild (one batched DELETE per guild) and pick up renames we did not hear about
+    for guild_id, guild_state in list(bot.state.guilds.items()):
+        guild = bot.get_guild(guild_id)
+        if guild is None or not guild_state.user_statuses or not status_store.owns_guild(guild_id):
+            continue
+        try:
+            if not guild.chunked:
+                await guild.chunk()
+            orphans = []
+            for user_id, _ in list(guild_state.user_statuses.items()):
+                member = guild.get_member(user_id)
+                if member is None:
+                    orphans.append(user_id)
+                else:
+                    _sync_display_name(guild_state, member)
+            if orphans:
+                await remove_departed_members(guild_state, orphans)
+                logger.info(f"Reconciliation removed {len(orphans)} departed member(s) from the status board of guild {guild_id}.")
+        except Exception as e:
+            logger.error(f"Member reconciliation failed for guild {guild_id}: {e}", exc_info=True)
 
-            if user_ids:
-                try:
-                    user_id = int(user_ids[0])
-                    # Fetch the member to ensure you get the display_avatar (guild-specific or global)
-                    user = await message.guild.fetch_member(user_id)
-
-                    if user:
-                        # Create embed with user's profile picture
-                        embed = discord.Embed(
-                            title=f"🎉 Happy Birthday, {user.display_name}! 🎉", # Enhanced title
-                            color=discord.Color.purple(),
-                            description=f"Wishing a fantastic day to {user.mention}! May your year be filled with joy, success, and epic adventures! 🎂✨"
-                        )
-                        # Set the image to the user's display avatar (which includes guild avatars)
-                        embed.set_image(url=user.display_avatar.url)
-                        embed.set_footer(text="Celebrating another trip around the sun with the Arashikage Clan!")
-
-                        # Log the action
-                        logger.info(f"Sending birthday embed for user {user.id} in channel {BIRTHDAY_CHANNEL_ID} (Avatar URL: {user.display_avatar.url})")
-
-                        # Send the embed in the birthday channel
-                        await message.channel.send(embed=embed)
-
-                except discord.errors.NotFound as e:
-                    logger.error(f"User with ID {user_id} not found in guild {message.guild.id} during birthday message: {e}", exc_info=True)
-                    # Optional: Respond to channel if user not found, for debugging
-                    await message.channel.send(f"⚠️ Couldn't find the user for that birthday mention. Make sure it's a valid user!")
-                except discord.errors.Forbidden as e:
-                    logger.error(f"Bot lacks permissions to send birthday embed in channel {BIRTHDAY_CHANNEL_ID}: {e}", exc_info=True)
-                    # This specific error is already caught by the initial permission check, but good to have.
-                except Exception as e:
-                    logger.error(f"Unexpected error sending birthday message for user {user_id}: {e}", exc_info=True)
-                    # Optional: General error message
-                    await message.channel.send(f"An unexpected error occurred while processing the birthday message for <@{user_id}>.")
+@bot.event
+async def on_guild_join(guild):
+    # A clan that invited the bot back keeps its stored config and statuses
+    await load_from_db([guild])
+    board_refresher.mark_dirty(guild.id)
 
-    # Process commands if any
-    await bot.process_commands(message)
+@bot.event
+async def on_guild_remove(guild):
+    bot.state.guilds.pop(guild.id, None)
     
-@app.route("/")
-def home():
-    return "Arashikage Bot is running!"
-
-def run_flask():
-    app.run(host="0.0.0.0", port=8080)
+# --- Board API ---
+# Read-only JSON copy of the status boards for websites and overlays, served by the HTTP
+# server below. A guild's snapshot is encoded once per change of its status index and
+# reused for every viewer; its hash is the ETag, so unchanged polls get a bodyless 304.
+# Viewers that want pushes long-poll (?wait=) or hold an event stream; both park on one
+# event per guild that board_refresher.mark_dirty() sets, and re-read after a short delay
+# so a burst of changes costs one snapshot rather than one per change.
+def board_data(guild_state):
+    index = guild_state.user_statuses
+    statuses = []
+    for status in index.statuses():
+        members = index.members(status)
+        if not members:
+            continue
+        statuses.append({
+            "key": status,
+            "name": status_catalog.name(status),
+            "emoji": status_catalog.emoji(status),
+            "count": len(members),
+            "members": [{"id": str(user_id), "name": index.name(user_id), "since": guild_state.status_since.get(user_id)} for user_id in members],
+        })
+    return {
+        "guild_id": str(guild_state.guild_id),  # Snowflakes exceed JavaScript's safe integers
+        "updated_at": index.updated_at,
+        "total": len(index),
+        "statuses": statuses,
+    }
+
+class BoardFeed:
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.streams = 0  # Open event streams
+        self.closing = False
+        self._snapshots = {}  # guild_id -> (index, version, body, etag)
+        self._changed = {}  # guild_id -> asyncio.Event set on the next change
+
+    def notify(self, guild_id):
+        changed = self._changed.pop(guild_id, None)
+        if changed:
+            changed.set()
+
+    def close(self):
+        # Releases every waiting long-poll and stream so the server can shut down
+        self.closing = True
+        for guild_id in list(self._changed):
+            self.notify(guild_id)
+
+    def snapshot(self, guild_state):
+        # -> (body, etag), rebuilt only when the status index changed since the last call
+        index = guild_state.user_statuses
+        cached = self._snapshots.get(guild_state.guild_id)
+        if cached is None or cached[0] is not index or cached[1] != index.version:
+            body = json.dumps(board_data(guild_state), ensure_ascii=False, separators=(",", ":")).encode()
+            cached = (index, index.version, body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+            self._snapshots[guild_state.guild_id] = cached
+            BOARD_API_SNAPSHOTS.inc()
+        return cached[2], cached[3]
+
+    async def wait_for_change(self, guild_state, etag, timeout):
+        # The snapshot as soon as its ETag differs from `etag`, or the current one after `timeout`
+        deadline = time.monotonic() + timeout
+        while not self.closing:
+            body, current = self.snapshot(guild_state)
+            remaining = deadline - time.monotonic()
+            if current != etag or remaining <= 0:
+                return body, current
+            changed = self._changed.setdefault(guild_state.guild_id, asyncio.Event())
+            waiter = asyncio.ensure_future(changed.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=remaining)
+            finally:
+                waiter.cancel()
+            if changed.is_set() and not self.closing:
+                await asyncio.sleep(min(self.min_interval, max(0.0, deadline - time.monotonic())))
+        return self.snapshot(guild_state)
+
+board_feed = BoardFeed(BOARD_API_MIN_INTERVAL)
+metrics.add(Gauge("clanbot_board_api_streams", "Open board event streams.", lambda: board_feed.streams))
+
+def _etag_matches(header, etag):
+    return header is not None and (header.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in header.split(",")))
+
+# --- HTTP Server ---
+# Served by aiohttp on the bot's own event loop (no extra thread), so "/" reflects the
+# real state of the process: gateway shards, heartbeat latency and the DB writer.
+def health_report():
+    shards = dict(bot.shards) if bot.is_ready() else {}
+    latency = bot.latency
+    checks = {
+        "gateway_ready": bot.is_ready() and not bot.is_closed(),
+        "shards_connected": bool(shards) and not any(shard.is_closed() for shard in shards.values()),
+        "heartbeat": math.isfinite(latency) and latency < HEALTH_MAX_LATENCY,
+        "db_writer": db.is_alive() and db.queue_depth < HEALTH_MAX_DB_QUEUE,
+        "status_store": status_store.healthy(),
+    }
+    return {
+        "status": "ok" if all(checks.values()) else "unhealthy",
+        "checks": checks,
+        "latency_seconds": round(latency, 4) if math.isfinite(latency) else None,
+        "shards": {shard_id: round(shard.latency, 4) if math.isfinite(shard.latency) else None for shard_id, shard in shards.items()},
+        "db": db.stats(),
+        "status_store": status_store.stats(),
+    }
+
+class HttpServer:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get("/", self.health)
+        self.app.router.add_get("/metrics", self.metrics)
+        self.app.router.add_get("/guilds/{guild_id}/board", self.board)
+        self.app.router.add_get("/guilds/{guild_id}/board/events", self.board_events)
+        self._runner = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"HTTP server listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._runner:
+            board_feed.close()
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def health(self, request):
+        report = health_report()
+        return web.json_response(report, status=200 if report["status"] == "ok" else 503)
+
+    async def metrics(self, request):
+        return web.Response(body=metrics.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    def _board_guild(self, request, endpoint):
+        try:
+            guild_id = int(request.match_info["guild_id"])
+        except ValueError:
+            guild_id = None
+        guild_state = bot.state.guilds.get(guild_id)
+        if guild_state is None or not (BOARD_API_GUILDS == "*" or str(guild_id) in BOARD_API_GUILDS.split(",")):
+            # Unpublished guilds and guilds on another process's shards look the same
+            BOARD_API_REQUESTS.inc(endpoint, 404)
+            raise web.HTTPNotFound(text="No published board for this guild.", headers={"Access-Control-Allow-Origin": BOARD_API_ORIGIN})
+        return guild_state
+
+    async def board(self, request):
+        # ?wait=N turns a request whose If-None-Match is still current into a long-poll
+        guild_state = self._board_guild(request, "board")
+        try:
+            wait = min(max(float(request.query.get("wait", "0")), 0.0), BOARD_API_MAX_WAIT)
+        except ValueError:
+            BOARD_API_REQUESTS.inc("board", 400)
+            raise web.HTTPBadRequest(text="wait must be a number of seconds.")
+        if_none_match = request.headers.get("If-None-Match")
+        body, etag = board_feed.snapshot(guild_state)
+        if wait and _etag_matches(if_none_match, etag):
+            body, etag = await board_feed.wait_for_change(guild_state, etag, wait)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Access-Control-Allow-Origin": BOARD_API_ORIGIN,
+                   "Access-Control-Expose-Headers": "ETag"}
+        if _etag_matches(if_none_match, etag):
+            BOARD_API_REQUESTS.inc("board", 304)
+            return web.Response(status=304, headers=headers)
+        BOARD_API_REQUESTS.inc("board", 200)
+        return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+
+    async def board_events(self, request):
+        # Server-sent events: the snapshot now (unless Last-Event-ID already has it) and after every change
+        guild_state = self._board_guild(request, "events")
+        if board_feed.streams >= BOARD_API_MAX_STREAMS:
+            BOARD_API_REQUESTS.inc("events", 503)
+            raise web.HTTPServiceUnavailable(text="Too many open board streams.", headers={"Retry-After": "30"})
+        BOARD_API_REQUESTS.inc("events", 200)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+                                               "X-Accel-Buffering": "no", "Access-Control-Allow-Origin": BOARD_API_ORIGIN})
+        await response.prepare(request)
+        etag = request.headers.get("Last-Event-ID")
+        board_feed.streams += 1
+        try:
+            while not board_feed.closing:
+                body, current = await board_feed.wait_for_change(guild_state, etag, BOARD_API_KEEPALIVE)
+                if current == etag:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                etag = current
+                await response.write(b"event: board\nid: " + etag.encode() + b"\ndata: " + body + b"\n\n")
+        except ConnectionResetError:
+            pass  # The viewer went away
+        finally:
+            board_feed.streams -= 1
+        return response
+
+http_server = HttpServer(HTTP_HOST, HTTP_PORT)
 
 @bot.event
 async def on_error(event, *args, **kwargs):
     logger.error(f"Unhandled error in event {event}: {args} {kwargs}", exc_info=True)
 
-# --- Start the Bot and Flask Server ---
+# --- Start the Bot ---
 if __name__ == "__main__":
     try:
-        # Run Flask in a separate thread
-        flask_thread = threading.Thread(target=run_flask)
-        flask_thread.start()
-
-        # Start Discord bot
-        bot.run(BOT_TOKEN)
+        # The HTTP server starts with the bot, on the same event loop (see setup_hook).
+        # discord.py logs through the root logger set up above instead of its own handler.
+        bot.run(BOT_TOKEN, log_handler=None)
 
     except discord.errors.LoginFailure as e:
         logger.error(f"Failed to log in: {e}. Please check your bot token.", exc_info=True)
@@ -0,0 +1,84 @@
+"""Board pages mode, rendered into benchmarks/fake_discord.py channels."""
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+WORKDIR = tempfile.mkdtemp(prefix="clanbot-tests-")
+
+# bot.py reads its configuration at import time
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ.setdefault("STATUS_STORE", "memory")
+os.environ.setdefault("STATUS_DB_PATH", os.path.join(WORKDIR, "test.db"))
+os.environ.setdefault("LOG_FILE", os.path.join(WORKDIR, "test.log"))
+
+import bot  # noqa: E402
+from fake_discord import FakeDiscord, make_clan  # noqa: E402
+
+GUILD_ID = 1
+
+
+class BoardPagesTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.discord = FakeDiscord()
+        self.discord.install(bot.bot)
+        channel_id = self.discord.next_id()
+        self.guild = make_clan(self.discord, GUILD_ID, channel_id, 5)
+        self.channel = self.discord.channels[channel_id]
+        self.members = self.guild.members
+        self.guild_state = bot.GuildState(GUILD_ID, status_channel_id=channel_id)
+        self._saved = bot.BOARD_PAGE_SIZE
+
+    async def asyncTearDown(self):
+        bot.BOARD_PAGE_SIZE = self._saved
+
+    def set_status(self, member, status):
+        self.guild_state.user_statuses.set(member.id, status, member.display_name)
+
+    async def render(self):
+        await bot._update_board_pages(self.guild_state, self.channel)
+
+    def assert_board_in_order(self, keys):
+        board_pages = self.guild_state.board_pages
+        self.assertEqual(sorted(board_pages, key=board_pages.get), keys)
+        self.assertEqual(sorted(self.channel.messages), sorted(board_pages.values()))
+
+    def catalog_pages(self, *extra):
+        keys = ["header"]
+        for status in bot.status_catalog.definitions:
+            keys.append(f"{status}:0")
+            keys.extend(key for key in extra if key.startswith(f"{status}:"))
+        return keys
+
+    async def test_every_group_has_a_page_from_the_first_post(self):
+        self.set_status(self.members[0], "s")
+        await self.render()
+        self.assert_board_in_order(self.catalog_pages())
+
+        sent = self.discord.rest_calls["send_message"]
+        self.set_status(self.members[1], "srn")
+        await self.render()
+        self.assert_board_in_order(self.catalog_pages())
+        self.assertEqual(self.discord.rest_calls["send_message"], sent)
+        self.assertEqual(self.discord.rest_calls["edit_message"], 1)
+
+    async def test_overflow_page_moves_the_pages_after_it(self):
+        bot.BOARD_PAGE_SIZE = 2
+        for member in self.members[:2]:
+            self.set_status(member, "srn")
+        self.set_status(self.members[2], "o")
+        await self.render()
+
+        self.set_status(self.members[3], "srn")
+        await self.render()
+        self.assert_board_in_order(self.catalog_pages("srn:1"))
+
+        self.set_status(self.members[3], "o")
+        await self.render()
+        self.assert_board_in_order(self.catalog_pages())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+"""Status store backends, with the Redis one run against benchmarks/fake_redis.py."""
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+WORKDIR = tempfile.mkdtemp(prefix="clanbot-tests-")
+
+# bot.py reads its configuration at import time
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ["STATUS_STORE"] = "memory"
+os.environ["STATUS_DB_PATH"] = os.path.join(WORKDIR, "test.db")
+os.environ["LOG_FILE"] = os.path.join(WORKDIR, "test.log")
+
+import bot  # noqa: E402
+from fake_discord import FakeDiscord, make_clan  # noqa: E402
+from fake_redis import FakeRedis  # noqa: E402
+
+GUILD_ID = 1
+
+
+async def wait_for(predicate, timeout=3):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+class MemoryStatusStoreTest(unittest.IsolatedAsyncioTestCase):
+    async def test_save_load_remove(self):
+        store = bot.MemoryStatusStore()
+        store.save(1, 10, "srn", "ten", 1.0, None)
+        store.save(1, 11, "b", "eleven", 2.0, 9.0)
+        store.save(2, 10, "o", "ten", 3.0, None)
+        store.remove(1, 10)
+        self.assertEqual(await store.load([1]), [(1, 11, "b", "eleven", 2.0, 9.0)])
+        await store.remove_many(2, [10])
+        self.assertEqual(await store.load([2]), [])
+        self.assertTrue(store.owns_guild(1))
+        self.assertEqual(await store.claim([1]), set())
+
+    def test_backend_missing_a_method_cannot_be_created(self):
+        class Incomplete(bot.StatusStore):
+            async def load(self, guild_ids):
+                return []
+
+            def save(self, guild_id, user_id, status, display_name, since, expires_at):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+class RedisStatusStoreTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeRedis()
+        self.url = await self.server.start()
+        self.discord = FakeDiscord()
+        self.discord.install(bot.bot)
+        self.guild = make_clan(self.discord, GUILD_ID, self.discord.next_id(), 5)
+        self.members = self.guild.members
+        bot.bot.state = bot.BotState()
+        self.guild_state = bot.bot.state.for_guild(GUILD_ID)
+        self.stores = []
+        self._saved = (bot.status_store, bot.STORE_RETRY_SECONDS)
+        bot.STORE_RETRY_SECONDS = 0.05
+
+    async def asyncTearDown(self):
+        for store in self.stores:
+            await store.close()
+        await bot.board_refresher.stop()
+        await self.server.stop()
+        bot.status_store, bot.STORE_RETRY_SECONDS = self._saved
+
+    async def make_store(self, lease_seconds=5):
+        store = bot.RedisStatusStore(self.url, "test", 0.01, lease_seconds)
+        await store.start()
+        self.stores.append(store)
+        return store
+
+    async def test_changes_propagate_between_stores(self):
+        local, remote = await self.make_store(), await self.make_store()
+        bot.status_store = local
+        remote.save(GUILD_ID, self.members[0].id, "srn", "member000000", 1.0, None)
+        remote.save(GUILD_ID, self.members[1].id, "b", "member000001", 2.0, None)
+        await wait_for(lambda: len(self.guild_state.user_statuses) == 2)
+        self.assertEqual(self.guild_state.user_statuses.get(self.members[0].id), "srn")
+
+        remote.remove(GUILD_ID, self.members[0].id)
+        await wait_for(lambda: len(self.guild_state.user_statuses) == 1)
+        self.assertEqual(await local.load([GUILD_ID]), [(GUILD_ID, self.members[1].id, "b", "member000001", 2.0, None)])
+
+    async def test_own_changes_are_not_applied_twice(self):
+        local = await self.make_store()
+        bot.status_store = local
+        local.save(GUILD_ID, self.members[0].id, "srn", "member000000", 1.0, None)
+        await wait_for(lambda: local.batches_written == 1)
+        await asyncio.sleep(0.05)
+        self.assertEqual(local.remote_changes, 0)
+        self.assertEqual(len(self.guild_state.user_statuses), 0)
+
+    async def test_malformed_changes_do_not_stop_syncing(self):
+        local, remote = await self.make_store(), await self.make_store()
+        bot.status_store = local
+        self.server.cmd_publish(local.channel.encode(), b'{"origin": "elsewhere", "changes": [[1, 2], "junk", [%d, %d, ["b", null, 1.0, null]]]}'
+                                % (GUILD_ID, self.members[0].id))
+        await wait_for(lambda: len(self.guild_state.user_statuses) == 1)
+        self.assertEqual(self.guild_state.user_statuses.name(self.members[0].id), str(self.members[0].id))
+
+        remote.save(GUILD_ID, self.members[1].id, "srn", "member000001", 2.0, None)
+        await wait_for(lambda: len(self.guild_state.user_statuses) == 2)
+
+    async def test_lease_is_exclusive_and_handed_over_on_close(self):
+        first, second = await self.make_store(), await self.make_store()
+        self.assertEqual(await first.claim([GUILD_ID]), {GUILD_ID})
+        self.assertEqual(await second.claim([GUILD_ID]), set())
+        self.assertTrue(first.owns_guild(GUILD_ID))
+        self.assertFalse(second.owns_guild(GUILD_ID))
+
+        await first.close()
+        self.stores.remove(first)
+        self.assertEqual(await second.claim([GUILD_ID]), {GUILD_ID})
+        self.assertTrue(second.owns_guild(GUILD_ID))
+
+    async def test_lapsed_lease_is_neither_renewed_nor_released(self):
+        first, second = await self.make_store(), await self.make_store()
+        await first.claim([GUILD_ID])
+        lease_key = first._lease_key(GUILD_ID).encode()
+        self.server.cmd_del(lease_key)  # The lease ran out before the next renewal
+        self.assertEqual(await second.claim([GUILD_ID]), {GUILD_ID})
+
+        await first.claim([GUILD_ID])
+        self.assertFalse(first.owns_guild(GUILD_ID))
+        self.assertEqual(self.server.cmd_get(lease_key), second.origin.encode())
+
+        first._owned.add(GUILD_ID)  # Believes it still holds the lease when it shuts down
+        await first.close()
+        self.stores.remove(first)
+        self.assertEqual(self.server.cmd_get(lease_key), second.origin.encode())
+
+    async def test_failed_write_is_requeued(self):
+        store = await self.make_store()
+        self.server.drop_clients()
+        await asyncio.sleep(0.01)
+        store.save(GUILD_ID, self.members[0].id, "srn", "member000000", 1.0, None)
+        await wait_for(lambda: store.batches_written == 1)
+        self.assertEqual(len(await store.load([GUILD_ID])), 1)
+        self.assertEqual(store.stats()["pending"], 0)
+
+    async def test_resync_after_lost_subscription(self):
+        local = await self.make_store()
+        bot.status_store = local
+        local.save(GUILD_ID, self.members[0].id, "srn", "member000000", 1.0, None)
+        await wait_for(lambda: local.batches_written == 1)
+        self.guild_state.user_statuses.set(self.members[0].id, "srn", "member000000")
+
+        self.server.drop_clients()
+        remote = await self.make_store()
+        remote.remove(GUILD_ID, self.members[0].id)
+        remote.save(GUILD_ID, self.members[2].id, "dl", "member000002", 3.0, None)
+        await wait_for(lambda: remote.batches_written == 1)
+        # Published while local was not subscribed; only the resync brings it in
+        await wait_for(lambda: dict(self.guild_state.user_statuses.items()) == {self.members[2].id: "dl"})
+
+
+if __name__ == "__main__":
+    unittest.main()